@@ -1,11 +1,45 @@
-import pyautogui
+"""
+Mouse automation for drawing solved wires.
+
+Each wire is turned into one precomputed event stream by path_events() and
+handed to an input backend:
+
+    sendinput  Windows SendInput through ctypes
+    xtest      X11 XTest extension through ctypes (libXtst)
+    pyautogui  The original pyautogui moveTo/dragTo drawing, kept as fallback
+    dryrun     Records the events with their timing, injects nothing
+
+get_backend("auto") picks the fastest one available on this machine.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import sys
 import time
 
-pyautogui.PAUSE = 0.01
-pyautogui.PAUSE = 0.008
-# pyautogui.PAUSE = 0.004
-# pyautogui.PAUSE = 0.001
-# pyautogui.PAUSE = 0
+import planner
+import vision
+
+log = logging.getLogger(__name__)
+
+# Delay pyautogui adds after every call, also its settle time between steps.
+# calibrate.py measures a per-machine value into PROFILE_PATH.
+PAUSE = 0.008
+
+# Event stream timing for the direct backends, in seconds
+DEFAULT_DELAY = 0.004   # after each move while the button is held
+DEFAULT_SETTLE = 0.008  # after reaching the start, after mouse down and before mouse up
+
+BACKENDS = ("auto", "sendinput", "xtest", "pyautogui", "dryrun")
+
+# Calibrated timings per backend, written by calibrate.py
+PROFILE_PATH = "timing.json"
+
+# Seconds to let the game render the wires before verifying them
+VERIFY_WAIT = 0.05
 
 def pos_to_screen_pos(pos, config, grid_size=6):
     region_x, region_y, region_height = config[0], config[1], config[2]
@@ -16,69 +50,492 @@ def pos_to_screen_pos(pos, config, grid_size=6):
     screen_y = region_y + y * cell_height + cell_height / 2
     return (int(screen_x), int(screen_y))
 
-def complete_solve(solve, config, grid_size=6):
+def expand_path(steps):
+    """Expand turning points into every cell the wire passes through."""
+    expanded_path = []
+    for i in range(len(steps)):
+        expanded_path.append(steps[i])
+
+        # Add intermediate points between this step and the next
+        if i < len(steps) - 1:
+            current = steps[i]
+            next_step = steps[i + 1]
+
+            # Calculate intermediate points
+            dx = next_step[0] - current[0]
+            dy = next_step[1] - current[1]
+
+            # Add points every cell if the distance is greater than 1
+            distance = max(abs(dx), abs(dy))
+            if distance > 1:
+                for j in range(1, distance):
+                    intermediate_x = current[0] + (dx * j // distance)
+                    intermediate_y = current[1] + (dy * j // distance)
+                    expanded_path.append((intermediate_x, intermediate_y))
+    return expanded_path
+
+def path_events(steps, config, grid_size=6, delay=DEFAULT_DELAY, settle=DEFAULT_SETTLE, max_span=1):
+    """
+    Precompute the event stream that draws one wire.
+
+    Args:
+        steps: Path as a list of (x,y) turning points
+        config: [region_x, region_y, region_height] for screen positioning
+        grid_size: Size of the puzzle grid (default 6 for 6x6)
+        delay: Seconds to wait after each move while the button is held
+        settle: Seconds to wait after the first move, after mouse down and
+            after mouse up
+        max_span: Most cells one drag step may cover along a straight run
+            (default 1, every cell; None for no limit)
+
+    Returns:
+        List of (kind, screen_x, screen_y, wait) with kind "move", "down"
+        or "up"; wait is the pause after the event
+    """
+    cells = planner.merge_collinear(expand_path(steps), max_span)
+    start_x, start_y = pos_to_screen_pos(cells[0], config, grid_size)
+    events = [("move", start_x, start_y, settle), ("down", start_x, start_y, settle)]
+    for cell in cells[1:]:
+        screen_x, screen_y = pos_to_screen_pos(cell, config, grid_size)
+        events.append(("move", screen_x, screen_y, delay))
+    end_x, end_y = events[-1][1], events[-1][2]
+    # Let the last cell register before releasing
+    events[-1] = ("move", end_x, end_y, settle)
+    events.append(("up", end_x, end_y, settle))
+    return events
+
+class InputBackend:
+    """
+    Base class for mouse injection backends.
+
+    Subclasses implement _move(), _down() and _up(); send() plays an event
+    stream against them on an absolute schedule, so time spent injecting
+    does not add to the waits.
+
+    Args:
+        delay, settle: Event timing passed to path_events()
+    """
+
+    name = None
+
+    def __init__(self, delay=DEFAULT_DELAY, settle=DEFAULT_SETTLE):
+        self.delay = delay
+        self.settle = settle
+
+    def events(self, steps, config, grid_size=6, max_span=1):
+        """Event stream for one wire with this backend's timing."""
+        return path_events(steps, config, grid_size, self.delay, self.settle, max_span)
+
+    def send(self, events, on_down=None):
+        """
+        Inject one wire's events.
+
+        Args:
+            events: As returned by path_events()
+            on_down: Optional callable run right after the mouse down
+        """
+        deadline = time.perf_counter()
+        for kind, x, y, wait in events:
+            if kind == "move":
+                self._move(x, y)
+            elif kind == "down":
+                self._down()
+                if on_down is not None:
+                    on_down()
+            else:
+                self._up()
+
+            deadline += wait
+            remaining = deadline - time.perf_counter()
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def _move(self, x, y):
+        raise NotImplementedError
+
+    def _down(self):
+        raise NotImplementedError
+
+    def _up(self):
+        raise NotImplementedError
+
+class _MOUSEINPUT(ctypes.Structure):
+    _fields_ = [("dx", ctypes.c_long), ("dy", ctypes.c_long), ("mouseData", ctypes.c_ulong),
+                ("dwFlags", ctypes.c_ulong), ("time", ctypes.c_ulong),
+                ("dwExtraInfo", ctypes.POINTER(ctypes.c_ulong))]
+
+class _INPUT(ctypes.Structure):
+    # MOUSEINPUT is the largest member of the INPUT union, so it alone gives
+    # the sizeof(INPUT) SendInput checks
+    _fields_ = [("type", ctypes.c_ulong), ("mi", _MOUSEINPUT)]
+
+class SendInputBackend(InputBackend):
+    """Windows SendInput, one INPUT per event, absolute virtual-desktop coordinates."""
+
+    name = "sendinput"
+
+    INPUT_MOUSE = 0
+    MOUSEEVENTF_MOVE = 0x0001
+    MOUSEEVENTF_LEFTDOWN = 0x0002
+    MOUSEEVENTF_LEFTUP = 0x0004
+    MOUSEEVENTF_VIRTUALDESK = 0x4000
+    MOUSEEVENTF_ABSOLUTE = 0x8000
+
+    def __init__(self, delay=DEFAULT_DELAY, settle=DEFAULT_SETTLE):
+        super().__init__(delay, settle)
+        self._user32 = ctypes.windll.user32
+        # Per-monitor DPI awareness, so coordinates match the mss capture
+        try:
+            ctypes.windll.shcore.SetProcessDpiAwareness(2)
+        except (AttributeError, OSError):
+            pass
+        # SM_XVIRTUALSCREEN, SM_YVIRTUALSCREEN, SM_CXVIRTUALSCREEN, SM_CYVIRTUALSCREEN
+        metrics = self._user32.GetSystemMetrics
+        self._left, self._top = metrics(76), metrics(77)
+        self._width, self._height = metrics(78), metrics(79)
+
+    def _input(self, flags, x=0, y=0):
+        event = _INPUT(type=self.INPUT_MOUSE)
+        event.mi = _MOUSEINPUT(x, y, 0, flags, 0, None)
+        self._user32.SendInput(1, ctypes.byref(event), ctypes.sizeof(_INPUT))
+
+    def _move(self, x, y):
+        # Absolute coordinates are normalized to 0..65535 across the virtual desktop
+        nx = ((x - self._left) * 65535) // max(self._width - 1, 1)
+        ny = ((y - self._top) * 65535) // max(self._height - 1, 1)
+        self._input(self.MOUSEEVENTF_MOVE | self.MOUSEEVENTF_ABSOLUTE | self.MOUSEEVENTF_VIRTUALDESK, nx, ny)
+
+    def _down(self):
+        self._input(self.MOUSEEVENTF_LEFTDOWN)
+
+    def _up(self):
+        self._input(self.MOUSEEVENTF_LEFTUP)
+
+class XTestBackend(InputBackend):
+    """X11 XTest fake input events through libXtst, flushed once per event."""
+
+    name = "xtest"
+
+    def __init__(self, delay=DEFAULT_DELAY, settle=DEFAULT_SETTLE):
+        super().__init__(delay, settle)
+        xlib_path = ctypes.util.find_library("X11")
+        xtst_path = ctypes.util.find_library("Xtst")
+        if not xlib_path or not xtst_path:
+            raise OSError("libX11/libXtst not found")
+        self._xlib = ctypes.cdll.LoadLibrary(xlib_path)
+        self._xtst = ctypes.cdll.LoadLibrary(xtst_path)
+        self._xlib.XOpenDisplay.restype = ctypes.c_void_p
+        self._xlib.XFlush.argtypes = [ctypes.c_void_p]
+        self._xtst.XTestFakeMotionEvent.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int,
+                                                    ctypes.c_int, ctypes.c_ulong]
+        self._xtst.XTestFakeButtonEvent.argtypes = [ctypes.c_void_p, ctypes.c_uint, ctypes.c_int,
+                                                    ctypes.c_ulong]
+        self._display = self._xlib.XOpenDisplay(None)
+        if not self._display:
+            raise OSError("Cannot open X display")
+
+    def _move(self, x, y):
+        # Screen -1 is the screen the pointer is on
+        self._xtst.XTestFakeMotionEvent(self._display, -1, x, y, 0)
+        self._xlib.XFlush(self._display)
+
+    def _down(self):
+        self._xtst.XTestFakeButtonEvent(self._display, 1, True, 0)
+        self._xlib.XFlush(self._display)
+
+    def _up(self):
+        self._xtst.XTestFakeButtonEvent(self._display, 1, False, 0)
+        self._xlib.XFlush(self._display)
+
+class PyAutoGuiBackend(InputBackend):
+    """
+    The original drawing: pyautogui moveTo/mouseDown/dragTo with its PAUSE
+    sleeps. Slow, but works wherever pyautogui does.
+    """
+
+    name = "pyautogui"
+
+    def __init__(self, delay=DEFAULT_DELAY, settle=PAUSE):
+        super().__init__(delay, settle)
+        import pyautogui
+        pyautogui.PAUSE = settle
+        self._pyautogui = pyautogui
+
+    def send(self, events, on_down=None):
+        pyautogui = self._pyautogui
+        pause = self.settle
+        pyautogui.PAUSE = pause
+        debug = log.isEnabledFor(logging.DEBUG)
+        held = False
+        step = 0
+        for kind, x, y, _ in events:
+            if kind == "move" and not held:
+                # Move to starting position
+                pyautogui.moveTo(x, y)
+                if debug:
+                    log.debug("  Moving to start: %s", (x, y))
+                time.sleep(pause)
+            elif kind == "down":
+                # Mouse down to start drawing
+                pyautogui.mouseDown()
+                held = True
+                if on_down is not None:
+                    on_down()
+                time.sleep(pause)
+                if debug:
+                    log.debug("  Mouse down at %s", (x, y))
+            elif kind == "move":
+                step += 1
+                pyautogui.dragTo(x, y, button="left", duration=0.00001, mouseDownUp=False, tween=pyautogui.easeInOutQuart)
+                if debug:
+                    log.debug("  Dragging to step %d: %s", step, (x, y))
+            else:
+                # Mouse up to finish drawing
+                time.sleep(pause)
+                pyautogui.mouseUp()
+                held = False
+                time.sleep(pause*2)
+
+class DryRunBackend(InputBackend):
+    """
+    Injects nothing. Keeps (seconds since first event, kind, x, y) for every
+    event in self.log; with sleep=False the waits are skipped too.
+    """
+
+    name = "dryrun"
+
+    def __init__(self, delay=DEFAULT_DELAY, settle=DEFAULT_SETTLE, sleep=True):
+        super().__init__(delay, settle)
+        self.sleep = sleep
+        self.log = []
+        self._start = None
+
+    def send(self, events, on_down=None):
+        if not self.sleep:
+            events = [(kind, x, y, 0) for kind, x, y, _ in events]
+        super().send(events, on_down)
+
+    def _record(self, kind, x=None, y=None):
+        now = time.perf_counter()
+        if self._start is None:
+            self._start = now
+        self.log.append((now - self._start, kind, x, y))
+
+    def _move(self, x, y):
+        self._record("move", x, y)
+
+    def _down(self):
+        self._record("down")
+
+    def _up(self):
+        self._record("up")
+
+_BACKEND_CLASSES = {
+    "sendinput": SendInputBackend,
+    "xtest": XTestBackend,
+    "pyautogui": PyAutoGuiBackend,
+    "dryrun": DryRunBackend,
+}
+
+def get_backend(name="auto", delay=None, settle=None, profile=PROFILE_PATH):
+    """
+    Create an input backend.
+
+    Args:
+        name: One of BACKENDS; "auto" uses SendInput on Windows, XTest on
+            X11 and pyautogui anywhere else
+        delay, settle: Event timing; None takes the backend's calibrated
+            value from profile, or the default
+        profile: Timing profile written by calibrate.py
+
+    Returns:
+        InputBackend instance; falls back to pyautogui when the requested
+        backend can't be loaded here
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown input backend: {name!r} (expected one of {BACKENDS})")
+
+    if name == "auto":
+        if sys.platform == "win32":
+            name = "sendinput"
+        elif os.environ.get("DISPLAY"):
+            name = "xtest"
+        else:
+            name = "pyautogui"
+
+    def timing(name):
+        calibrated_delay, calibrated_settle = profile_timing(name, profile)
+        return (calibrated_delay if delay is None else delay,
+                calibrated_settle if settle is None else settle)
+
+    if name != "pyautogui":
+        try:
+            return _BACKEND_CLASSES[name](*timing(name))
+        except (AttributeError, OSError) as e:
+            log.warning("⚠️  %s input backend not available (%s), falling back to pyautogui", name, e)
+    return PyAutoGuiBackend(*timing("pyautogui"))
+
+def load_profile(path=PROFILE_PATH):
+    """Calibrated timing profile as a dict, or {} if there is none."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_profile(profile, path=PROFILE_PATH):
+    with open(path, "w") as f:
+        json.dump(profile, f, indent=2)
+
+def profile_timing(name, path=PROFILE_PATH):
+    """
+    (delay, settle) for a backend: the calibrated values if the profile has
+    them, the built-in defaults otherwise.
+    """
+    entry = load_profile(path).get(name, {})
+    default_settle = PAUSE if name == "pyautogui" else DEFAULT_SETTLE
+    return entry.get("delay", DEFAULT_DELAY), entry.get("settle", default_settle)
+
+def complete_solve(solve, config, grid_size=6, cancelled=None, on_first_mouse_down=None, backend=None,
+                   max_span=1):
     """
     Automate the solution by drawing wire paths with mouse movements.
 
     Args:
-        solve: List of paths, each path is a list of (x,y) coordinates
+        solve: List of paths, each path is a list of (x,y) coordinates, or
+            an iterator of (index, path) such as solver.iter_solve(); each
+            path is drawn as soon as the iterator yields it
         config: [region_x, region_y, region_height] for screen positioning
         grid_size: Size of the puzzle grid (default 6 for 6x6)
+        cancelled: Optional callable; drawing stops before the next path
+            once it returns True
+        on_first_mouse_down: Optional callable run right after the first
+            mouse down, e.g. to measure hotkey-to-drawing latency
+        backend: InputBackend to draw with (default: pyautogui with its
+            calibrated timing)
+        max_span: Most cells one drag step may cover (default 1; None for
+            no limit), see planner.merge_collinear()
+
+    Returns:
+        True if every path was drawn, False if cancelled part way
     """
-    time.sleep(pyautogui.PAUSE*3)  # Initial delay before starting
-    for path_idx, steps in enumerate(solve):
+    if backend is None:
+        backend = get_backend("pyautogui")
+    if isinstance(solve, (list, tuple)):
+        solve = enumerate(solve)
+
+    first_down = None
+    wires = 0
+
+    def mouse_down():
+        nonlocal first_down, on_first_mouse_down
+        if first_down is None:
+            first_down = time.perf_counter()
+        if on_first_mouse_down is not None:
+            on_first_mouse_down()
+            on_first_mouse_down = None
+
+    debug = log.isEnabledFor(logging.DEBUG)
+    time.sleep(backend.settle*3)  # Initial delay before starting
+    for path_idx, steps in solve:
+        if cancelled is not None and cancelled():
+            log.info("Drawing cancelled")
+            return False
+
         if not steps or len(steps) < 2:
-            print(f"Skipping path {path_idx + 1}: insufficient steps")
+            log.info("Skipping path %d: insufficient steps", path_idx + 1)
             continue
 
-        print(f"Drawing path {path_idx + 1}: {steps}")
-
-        # Move to starting position
-        start_screen_pos = pos_to_screen_pos(steps[0], config, grid_size)
-        pyautogui.moveTo(start_screen_pos[0], start_screen_pos[1])
-        print(f"  Moving to start: {steps[0]} -> {start_screen_pos}")
-
-        # Small delay before starting
-
-        time.sleep(pyautogui.PAUSE)
-        # Mouse down to start drawing
-        pyautogui.mouseDown()
-        time.sleep(pyautogui.PAUSE)
-        print(f"  Mouse down at {start_screen_pos}")
-
-        # Create expanded path with intermediate points
-        expanded_path = []
-        for i in range(len(steps)):
-            expanded_path.append(steps[i])
-
-            # Add intermediate points between this step and the next
-            if i < len(steps) - 1:
-                current = steps[i]
-                next_step = steps[i + 1]
-
-                # Calculate intermediate points
-                dx = next_step[0] - current[0]
-                dy = next_step[1] - current[1]
-
-                # Add points every cell if the distance is greater than 1
-                distance = max(abs(dx), abs(dy))
-                if distance > 1:
-                    for j in range(1, distance):
-                        intermediate_x = current[0] + (dx * j // distance)
-                        intermediate_y = current[1] + (dy * j // distance)
-                        expanded_path.append((intermediate_x, intermediate_y))
-
-        # Drag through all expanded steps
-        for i in range(1, len(expanded_path)):
-            step_screen_pos = pos_to_screen_pos(expanded_path[i], config, grid_size)
-            pyautogui.dragTo(step_screen_pos[0], step_screen_pos[1], button="left", duration=0.00001, mouseDownUp=False, tween=pyautogui.easeInOutQuart)
-            print(f"  Dragging to step {i}: {expanded_path[i]} -> {step_screen_pos}")
-
-        # Mouse up to finish drawing
-        time.sleep(pyautogui.PAUSE)
-        pyautogui.mouseUp()
-        print(f"  Mouse up - path {path_idx + 1} complete")
-
-        time.sleep(pyautogui.PAUSE*2)
-
-    print("All paths completed!")
+        if debug:
+            log.debug("Drawing path %d: %s", path_idx + 1, steps)
+        backend.send(backend.events(steps, config, grid_size, max_span), on_down=mouse_down)
+        wires += 1
+
+    if wires:
+        elapsed = time.perf_counter() - first_down
+        log.info("All paths completed! %d wires in %.0f ms (%.1f wires/s, %s)",
+                 wires, elapsed * 1000, wires / elapsed, backend.name)
+    else:
+        log.info("All paths completed!")
+    return True
+
+def broken_wires(processed, solutions, expected, grid_size=6):
+    """
+    Find wires the board doesn't show.
+
+    Every cell is labelled with the nearest wire color, taken from the
+    endpoint cells of the grid the solve was made from; a wire is broken
+    when any of its cells carries another label.
+
+    Args:
+        processed: Grid captured after drawing (to_grid + clean_black)
+        solutions: Paths that were drawn
+        expected: Processed grid the solutions were computed from
+        grid_size: Size of the puzzle grid (default 6 for 6x6)
+
+    Returns:
+        List of broken wire indices, or None if an endpoint changed color,
+        which means the puzzle closed or was replaced
+    """
+    drawn = [(i, path) for i, path in enumerate(solutions) if path and len(path) >= 2]
+    if not drawn:
+        return []
+
+    colors = [vision.pixel_color(expected, *path[0]) for _, path in drawn]
+    labels = vision.nearest_color_labels(processed, colors)
+
+    broken = []
+    for label, (i, path) in enumerate(drawn):
+        if labels[path[0][1], path[0][0]] != label or labels[path[-1][1], path[-1][0]] != label:
+            return None
+        if any(labels[y, x] != label for x, y in expand_path(path)):
+            broken.append(i)
+    return broken
+
+def verify_solve(solutions, expected, capture, config, grid_size=6, backend=None, retries=1,
+                 max_span=1, cancelled=None, wait=VERIFY_WAIT, sample=None):
+    """
+    Re-capture the puzzle after drawing and redraw only the wires that
+    didn't take, reusing the solution instead of solving again.
+
+    Args:
+        solutions: Paths that were drawn, one per pair
+        expected: Processed grid the solutions were computed from
+        capture: Callable returning a fresh frame of the puzzle region,
+            e.g. capture.RegionCapture.grab
+        config: [region_x, region_y, region_height] for screen positioning
+        grid_size: Size of the puzzle grid (default 6 for 6x6)
+        backend, max_span, cancelled: As for complete_solve()
+        retries: Redraw rounds before giving up
+        wait: Seconds to let the game render before each capture
+        sample: Callable turning a captured frame into the NxN color grid,
+            e.g. vision.ProbeSampler.sample (default vision.to_grid)
+
+    Returns:
+        List of wire indices still broken, [] when the board checks out
+    """
+    if sample is None:
+        sample = lambda frame: vision.to_grid(frame, grid_size=grid_size)
+
+    broken = []
+    for attempt in range(retries + 1):
+        time.sleep(wait)
+        processed = vision.clean_black(sample(capture()))
+        broken = broken_wires(processed, solutions, expected, grid_size)
+
+        if broken is None:
+            log.info("Puzzle closed or changed, nothing to verify")
+            return []
+        if not broken:
+            log.info("✅ Verified every wire on the board")
+            return []
+        if attempt == retries or (cancelled is not None and cancelled()):
+            break
+
+        log.info("🔁 Redrawing %d broken wire(s): %s", len(broken), [i + 1 for i in broken])
+        redraw = [solutions[i] if i in broken else [] for i in range(len(solutions))]
+        complete_solve(iter(planner.plan(redraw)), config, grid_size, cancelled=cancelled,
+                       backend=backend, max_span=max_span)
+
+    log.warning("⚠️  Wire(s) %s still broken after %d redraw(s)", [i + 1 for i in broken], retries)
+    return broken
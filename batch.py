@@ -0,0 +1,276 @@
+"""
+Offline solving of recorded captures.
+
+Runs the vision → solve stages of main.py over a directory, glob or list
+of screenshots on a process pool, one image per task, and streams one
+JSON line per image (pairs, paths and per-stage timings) to the output as
+results arrive. Useful to regression-test and profile many recorded
+boards at once. An image that takes longer than --timeout seconds gets
+an error line and its worker is replaced:
+
+    python batch.py recordings/ -o results.jsonl
+    python batch.py "recordings/*.png" -c auto -j 8
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import statistics
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from PIL import Image
+
+import locator
+import logs
+import solver
+import vision
+
+log = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+# Default seconds one image may take on a worker
+IMAGE_TIMEOUT = 60.0
+# Seconds between checks for finished and overdue images
+POLL_INTERVAL = 0.5
+
+def find_images(inputs):
+    """
+    Expand directories and glob patterns into a sorted list of image files.
+
+    Args:
+        inputs: Paths of files or directories, or glob patterns
+    """
+    found = set()
+    for entry in inputs:
+        if os.path.isdir(entry):
+            for name in os.listdir(entry):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    found.add(os.path.join(entry, name))
+        elif os.path.isfile(entry):
+            found.add(entry)
+        else:
+            found.update(path for path in glob.glob(entry, recursive=True)
+                         if path.lower().endswith(IMAGE_EXTENSIONS))
+    return sorted(found)
+
+def parse_region(config):
+    """[x, y, size] from an i|x|y|size config, 'auto', or None for whole images."""
+    if config is None or config == "auto":
+        return config
+    if not config.startswith("i"):
+        raise ValueError(f"Invalid config {config!r}, use 'i|x|y|size' or 'auto'")
+    return list(map(int, config[1:].split("|")))
+
+def solve_image(path, grid_size=6, engine="bitboard", region=None):
+    """
+    Run vision and the solver on one capture, the way main.py does.
+
+    Args:
+        path: Image file
+        grid_size: Size of the puzzle grid (default 6 for 6x6)
+        engine: Solver engine, one of solver.ENGINES
+        region: [x, y, size] to crop, "auto" to find the grid with
+            locator.locate(), or None if the image is the puzzle region
+
+    Returns:
+        JSON-ready dict with the image path, region, pairs, paths, whether
+        every pair was connected, and the milliseconds spent per stage; or
+        with an "error" message instead of the results
+    """
+    result = {"image": path}
+    timings = {}
+    start = time.perf_counter()
+
+    def lap(stage, since):
+        now = time.perf_counter()
+        timings[stage] = round((now - since) * 1000, 3)
+        return now
+
+    try:
+        stage = time.perf_counter()
+        with Image.open(path) as image:
+            frame = image.convert("RGB")
+        stage = lap("load", stage)
+
+        if region == "auto":
+            region = locator.locate(frame, grid_size)
+            stage = lap("locate", stage)
+            if region is None:
+                raise ValueError("no puzzle grid found")
+        if region is not None:
+            x, y, size = region
+            frame = frame.crop((x, y, x + size, y + size))
+        result["region"] = region
+
+        grid = vision.to_grid(frame, grid_size=grid_size)
+        stage = lap("grid", stage)
+
+        # Same guard as main.py: drawn wires or noise, not a fresh board
+        colored = vision.colored_cells(grid)
+        if colored > 2 * vision.MAX_PAIRS:
+            raise ValueError(f"board not fresh: {colored} colored cells, at most "
+                             f"{2 * vision.MAX_PAIRS} expected")
+
+        labels, _, pairs, ambiguity = vision.classify(grid, grid_size=grid_size)
+        stage = lap("classify", stage)
+
+        paths = solver.solve(pairs, grid_size=grid_size, engine=engine)
+        if not all(paths) and max(ambiguity, default=0) > vision.AMBIGUITY_THRESHOLD:
+            # Same fallback as main.py: the runner-up pairing of similar
+            # colors, if it solves
+            runner_up = vision.classify(grid, grid_size=grid_size, rank=1)
+            if runner_up is not None:
+                trial = solver.solve(runner_up[2], grid_size=grid_size, engine=engine)
+                if all(trial):
+                    labels, _, pairs, ambiguity = runner_up
+                    paths = trial
+        lap("solve", stage)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        timings["total"] = round((time.perf_counter() - start) * 1000, 3)
+        result["timings"] = timings
+        return result
+
+    timings["total"] = round((time.perf_counter() - start) * 1000, 3)
+    result.update({
+        "pairs": [[list(a), list(b)] for a, b in pairs],
+        "paths": [[list(cell) for cell in path] if path else None for path in paths],
+        "solved": bool(pairs) and all(paths),
+        "ambiguity": [round(float(a), 3) for a in ambiguity],
+        "timings": timings,
+    })
+    return result
+
+def _solve_on_pool(images, emit, workers, timeout, args):
+    """
+    Solve images on one process pool until they are all done or one of
+    them runs out of time.
+
+    A running task can't be cancelled, so an overdue image gets an error
+    result and the pool's workers are terminated; the caller starts a new
+    pool for the rest.
+
+    Returns:
+        Images still to solve, empty once every image was emitted
+    """
+    pool = ProcessPoolExecutor(max_workers=workers)
+    futures = {pool.submit(solve_image, path, *args): path for path in images}
+    pending = set(futures)
+    # Counted from when the pool hands a task to its workers
+    started = {}
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                emit(future.result())
+
+            now = time.perf_counter()
+            for future in pending:
+                if future.running():
+                    started.setdefault(future, now)
+            overdue = {future for future in pending if timeout and now - started.get(future, now) > timeout}
+            if overdue:
+                for future in overdue:
+                    emit({"image": futures[future], "error": f"TimeoutError: no result after {timeout:g} s",
+                          "timings": {}})
+                for process in list(pool._processes.values()):
+                    process.terminate()
+                return [futures[future] for future in pending - overdue]
+        return []
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def run_batch(images, output, workers=None, grid_size=6, engine="bitboard", region=None,
+              timeout=IMAGE_TIMEOUT):
+    """
+    Solve images on a process pool, writing JSON lines in completion order.
+
+    Args:
+        images: Image files
+        output: Text file object for the JSON lines, flushed per result
+        workers: Pool size (default: one per CPU)
+        grid_size, engine, region: As for solve_image()
+        timeout: Seconds one image may take before it is given up with an
+            error result (None or 0 for no limit)
+
+    Returns:
+        List of result dicts, in completion order
+    """
+    results = []
+
+    def emit(result):
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+        results.append(result)
+        if "error" in result:
+            log.warning("❌ %s: %s", result["image"], result["error"])
+        else:
+            log.debug("%s: %d pairs, %s in %.1f ms", result["image"], len(result["pairs"]),
+                      "solved" if result["solved"] else "unsolved", result["timings"]["total"])
+
+    remaining = list(images)
+    while remaining:
+        remaining = _solve_on_pool(remaining, emit, workers, timeout, (grid_size, engine, region))
+    return results
+
+def summarize(results, elapsed):
+    """Log solved counts and median per-stage milliseconds."""
+    done = [r for r in results if "error" not in r]
+    solved = sum(r["solved"] for r in done)
+    log.info("✅ %d images in %.1f s (%.1f images/s): %d solved, %d unsolved, %d failed",
+             len(results), elapsed, len(results) / elapsed if elapsed else 0.0,
+             solved, len(done) - solved, len(results) - len(done))
+
+    stages = []
+    for r in done:
+        stages.extend(stage for stage in r["timings"] if stage not in stages)
+    for stage in stages:
+        values = [r["timings"][stage] for r in done if stage in r["timings"]]
+        log.info("   %-8s median %8.2f ms, max %8.2f ms", stage, statistics.median(values), max(values))
+
+def main():
+    """Main function for command line usage."""
+    parser = argparse.ArgumentParser(description='Solve recorded puzzle captures in parallel')
+    parser.add_argument('inputs', nargs='+',
+                        help='Image files, directories or glob patterns')
+    parser.add_argument('-o', '--output', default='batch.jsonl',
+                        help='JSON lines file, one result per image (default: batch.jsonl)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Worker processes (default: one per CPU)')
+    parser.add_argument('-s', '--size', type=int, default=6,
+                        help='Size of the puzzle grid (default: 6 for 6x6)')
+    parser.add_argument('-e', '--engine', choices=solver.ENGINES, default='bitboard',
+                        help='Solver engine (default: bitboard)')
+    parser.add_argument('-c', '--config', default=None,
+                        help='Crop i|x|y|size from every image, or auto to find the grid in each '
+                             '(default: the images are the puzzle region)')
+    parser.add_argument('-t', '--timeout', type=float, default=IMAGE_TIMEOUT,
+                        help=f'Seconds one image may take before it is reported as an error, '
+                             f'0 for no limit (default: {IMAGE_TIMEOUT:g})')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='Log every image')
+
+    args = parser.parse_args()
+    try:
+        region = parse_region(args.config)
+    except ValueError as e:
+        parser.error(str(e))
+    logs.setup(verbose=args.verbose)
+
+    images = find_images(args.inputs)
+    if not images:
+        log.error("No images found in %s", args.inputs)
+        return
+    log.info("🗂️  Solving %d images with %s, writing %s", len(images), args.engine, args.output)
+
+    start = time.perf_counter()
+    with open(args.output, "w") as output:
+        results = run_batch(images, output, workers=args.jobs, grid_size=args.size, engine=args.engine,
+                            region=region, timeout=args.timeout)
+    summarize(results, time.perf_counter() - start)
+
+if __name__ == "__main__":
+    main()
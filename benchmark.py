@@ -0,0 +1,449 @@
+"""
+Solver benchmarks.
+
+Times the z3 encodings against each other on random solvable boards with
+1-13 wire pairs, the range the generator minigame produces. With --input,
+measures how many wires per second the automation event schedule draws
+instead.
+
+With --stages, times every pipeline stage (capture, sampling, matching,
+each solver engine, path extraction, visualization and input event
+generation) over a fixed corpus of rendered boards plus any recorded
+captures, and reports p50/p95/p99 latency and peak allocation per call.
+--save writes the results as JSON, --compare checks them against a saved
+baseline and exits with status 1 on a regression.
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+import automation
+import batch
+import capture
+import solver
+import vision
+
+def random_board(num_pairs, grid_size=6, rng=random, max_attempts=1000):
+    """
+    Build a random solvable puzzle by growing non-touching random walks.
+
+    Args:
+        num_pairs: Number of wire pairs to place
+        grid_size: Size of the square grid (default 6 for 6x6)
+        rng: random.Random instance (default: the random module)
+        max_attempts: Give up after this many failed layouts
+
+    Returns:
+        List of coordinate pairs [[(x1,y1), (x2,y2)], ...], or None
+    """
+    directions = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+
+    for _ in range(max_attempts):
+        used = set()
+        pairs = []
+        for _ in range(num_pairs):
+            free = [(x, y) for x in range(grid_size) for y in range(grid_size) if (x, y) not in used]
+            if len(free) < 2:
+                break
+            path = [rng.choice(free)]
+            length = rng.randint(2, 8)
+            while len(path) < length:
+                x, y = path[-1]
+                options = []
+                for dx, dy in directions:
+                    nx, ny = x + dx, y + dy
+                    if not (0 <= nx < grid_size and 0 <= ny < grid_size):
+                        continue
+                    if (nx, ny) in used or (nx, ny) in path:
+                        continue
+                    # A wire may only touch itself at the previous cell
+                    touching = sum((nx + ax, ny + ay) in path for ax, ay in directions)
+                    if touching == 1:
+                        options.append((nx, ny))
+                if not options:
+                    break
+                path.append(rng.choice(options))
+            if len(path) < 2:
+                break
+            used.update(path)
+            pairs.append([path[0], path[-1]])
+
+        if len(pairs) == num_pairs:
+            return pairs
+    return None
+
+def _board_from_pairs(pairs, grid_size):
+    board = [[0 for _ in range(grid_size)] for _ in range(grid_size)]
+    for i, [(x1, y1), (x2, y2)] in enumerate(pairs):
+        board[y1][x1] = i + 1
+        board[y2][x2] = i + 1
+    return board
+
+def bench_encodings(trials=5, grid_size=6, seed=0, max_pairs=13):
+    """
+    Time solve_with_z3 for every encoding on the same random boards.
+
+    Model templates are built before timing starts, so the numbers are the
+    per-solve latency a running session sees.
+
+    Returns:
+        Dict mapping pair count to {encoding: [seconds, ...]}
+    """
+    rng = random.Random(seed)
+    results = {}
+
+    print(f"{'pairs':>5} " + " ".join(f"{encoding + ' ms':>12}" for encoding in solver.Z3_ENCODINGS))
+    for num_pairs in range(1, max_pairs + 1):
+        boards = []
+        for _ in range(trials):
+            pairs = random_board(num_pairs, grid_size, rng)
+            if pairs is not None:
+                boards.append(_board_from_pairs(pairs, grid_size))
+        if not boards:
+            continue
+
+        results[num_pairs] = {}
+        for encoding in solver.Z3_ENCODINGS:
+            timings = []
+            # Warm up the template for this grid size / color count
+            solver.solve_with_z3(boards[0], grid_size, grid_size, encoding=encoding)
+            for board in boards:
+                start = time.perf_counter()
+                solver.solve_with_z3(board, grid_size, grid_size, encoding=encoding)
+                timings.append(time.perf_counter() - start)
+            results[num_pairs][encoding] = timings
+
+        print(f"{num_pairs:>5} " + " ".join(
+            f"{statistics.median(results[num_pairs][encoding]) * 1000:>12.1f}"
+            for encoding in solver.Z3_ENCODINGS))
+
+    return results
+
+def bench_input(trials=20, grid_size=6, seed=0, delay=automation.DEFAULT_DELAY,
+                settle=automation.DEFAULT_SETTLE, region=600):
+    """
+    Draw random solved boards through the dry-run input backend.
+
+    The dry run keeps the real event timing but injects nothing, so the
+    result is the wires-per-second ceiling of the event schedule.
+
+    Returns:
+        List of wires/s, one per board
+    """
+    rng = random.Random(seed)
+    config = [0, 0, region]
+    rates = []
+
+    print(f"{'pairs':>5} {'events':>7} {'ms':>8} {'wires/s':>8}")
+    for _ in range(trials):
+        pairs = random_board(rng.randint(4, 13), grid_size, rng)
+        if pairs is None:
+            continue
+        paths = solver.solve(pairs, grid_size, engine="bitboard")
+        backend = automation.DryRunBackend(delay, settle)
+        start = time.perf_counter()
+        automation.complete_solve(paths, config, grid_size, backend=backend)
+        elapsed = time.perf_counter() - start
+        rates.append(len(pairs) / elapsed)
+        print(f"{len(pairs):>5} {len(backend.log):>7} {elapsed * 1000:>8.1f} {rates[-1]:>8.1f}")
+
+    print(f"Median: {statistics.median(rates):.1f} wires/s "
+          f"(delay {delay * 1000:g} ms, settle {settle * 1000:g} ms)")
+    return rates
+
+# Dot colors for rendered boards, one per pair
+BOARD_COLORS = [
+    (230, 40, 40), (40, 200, 60), (40, 90, 250), (250, 220, 30), (250, 130, 20), (160, 40, 240),
+    (30, 220, 230), (250, 60, 190), (140, 80, 30), (240, 240, 240), (130, 130, 255), (20, 110, 50),
+    (200, 150, 150),
+]
+
+def render_board(pairs, grid_size=6, size=600):
+    """
+    Draw a puzzle region like the game's: dark cells, grid lines and a
+    colored dot on both ends of every pair.
+
+    Returns:
+        size x size x 3 uint8 array
+    """
+    image = np.full((size, size, 3), 18, dtype=np.uint8)
+    pitch = size / grid_size
+    for k in range(grid_size + 1):
+        line = min(int(round(k * pitch)), size - 2)
+        image[:, line:line + 2] = (60, 60, 70)
+        image[line:line + 2, :] = (60, 60, 70)
+
+    yy, xx = np.mgrid[0:size, 0:size]
+    for color, pair in zip(BOARD_COLORS, pairs):
+        for x, y in pair:
+            dot = (xx - (x + 0.5) * pitch) ** 2 + (yy - (y + 0.5) * pitch) ** 2 < (0.35 * pitch) ** 2
+            image[dot] = color
+    return image
+
+def _solved_board(pairs, paths, grid_size):
+    """The filled board extract_paths_from_solution() reads, from solved paths."""
+    board = [[0 for _ in range(grid_size)] for _ in range(grid_size)]
+    for i, path in enumerate(paths):
+        for x, y in automation.expand_path(path):
+            board[y][x] = i + 1
+    return board
+
+def stage_corpus(boards=30, grid_size=6, seed=0, size=600, recorded=()):
+    """
+    Fixed set of boards for bench_stages(): rendered random boards plus
+    recorded region captures, each run through vision and the solver once.
+
+    Args:
+        boards: Rendered random boards (the same ones for the same seed)
+        recorded: Paths of recorded captures of the puzzle region
+
+    Returns:
+        List of dicts with the image, grid, processed grid, pairs, paths
+        and solved board; recorded boards that don't solve are left out
+    """
+    rng = random.Random(seed)
+    images = []
+    while len(images) < boards:
+        pairs = random_board(rng.randint(4, 13), grid_size, rng)
+        if pairs is not None:
+            images.append(render_board(pairs, grid_size, size))
+    for path in recorded:
+        with Image.open(path) as image:
+            images.append(np.asarray(image.convert("RGB").resize((size, size))))
+
+    corpus = []
+    for image in images:
+        grid = vision.to_grid(image, grid_size=grid_size)
+        processed = vision.clean_black(grid)
+        pairs = vision.match(processed, grid_size=grid_size)
+        paths = solver.solve(pairs, grid_size, engine="bitboard")
+        if not pairs or not all(paths):
+            continue
+        corpus.append({"image": image, "grid": grid, "processed": processed, "pairs": pairs,
+                       "paths": paths, "solved": _solved_board(pairs, paths, grid_size)})
+    return corpus
+
+def _stages(grid_size, size, screen, strips):
+    """
+    (name, function of a corpus board) for every benchmarked stage.
+
+    screen and strips are the full and strip RegionCaptures of the region
+    to time; the caller closes them.
+    """
+    config = [0, 0, size]
+    sampler = vision.ProbeSampler(size, grid_size=grid_size)
+    stages = [
+        ("capture_screen", lambda b: vision.capture_screen(config)),
+        ("region_grab", lambda b: screen.grab()),
+        ("region_grab[strips]", lambda b: strips.grab()),
+        ("to_grid", lambda b: vision.to_grid(b["image"], grid_size=grid_size)),
+        ("probe_sample", lambda b: sampler.sample(b["image"])),
+        ("clean_black", lambda b: vision.clean_black(b["grid"])),
+        ("match", lambda b: vision.match(b["processed"], grid_size=grid_size)),
+        ("classify", lambda b: vision.classify(b["grid"], grid_size=grid_size)),
+    ]
+    for engine in solver.ENGINES:
+        stages.append((f"solve[{engine}]",
+                       lambda b, engine=engine: solver.solve(b["pairs"], grid_size, engine=engine)))
+    stages += [
+        ("extract_paths_from_solution",
+         lambda b: solver.extract_paths_from_solution(b["solved"], b["pairs"], grid_size)),
+        ("visualize_path", lambda b: vision.visualize_path(b["paths"], b["processed"], grid_size)),
+        ("path_events", lambda b: [automation.path_events(path, config, grid_size) for path in b["paths"]]),
+        # Zero timing: what is left is the scheduling overhead
+        ("dry_run", lambda b: automation.complete_solve(
+            b["paths"], config, grid_size, backend=automation.DryRunBackend(0, 0, sleep=False))),
+    ]
+    return stages
+
+def bench_stages(corpus, repeat=5, grid_size=6, size=600):
+    """
+    Time every pipeline stage over the corpus.
+
+    Each stage is warmed up on the first board, timed repeat times over
+    every board, then run once more per board under tracemalloc for the
+    peak memory allocated during a call. Stages that can't run here (e.g.
+    screen capture without a display) are skipped.
+
+    Returns:
+        Results dict: "meta" describing the run, "stages" mapping each
+        stage name to calls, mean/p50/p95/p99 milliseconds and median/max
+        peak KiB per call, and "skipped" mapping each skipped stage to why
+    """
+    results = {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "boards": len(corpus),
+            "repeat": repeat,
+        },
+        "stages": {},
+        "skipped": {},
+    }
+
+    print(f"{'stage':<28} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak KiB':>9}")
+    config = [0, 0, size]
+    with capture.RegionCapture(config) as screen, \
+            capture.RegionCapture(config, grid_size=grid_size) as strips:
+        for name, stage in _stages(grid_size, size, screen, strips):
+            try:
+                stage(corpus[0])
+            except Exception as e:
+                reason = f"{type(e).__name__}: {e}"
+                results["skipped"][name] = reason
+                print(f"{name:<28} skipped ({reason})")
+                continue
+
+            timings = []
+            for _ in range(repeat):
+                for board in corpus:
+                    start = time.perf_counter()
+                    stage(board)
+                    timings.append(time.perf_counter() - start)
+
+            peaks = []
+            tracemalloc.start()
+            try:
+                for board in corpus:
+                    before = tracemalloc.get_traced_memory()[0]
+                    tracemalloc.reset_peak()
+                    stage(board)
+                    peaks.append(tracemalloc.get_traced_memory()[1] - before)
+            finally:
+                tracemalloc.stop()
+
+            ms = np.array(timings) * 1000
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            results["stages"][name] = {
+                "calls": len(timings),
+                "mean_ms": round(float(ms.mean()), 4),
+                "p50_ms": round(float(p50), 4),
+                "p95_ms": round(float(p95), 4),
+                "p99_ms": round(float(p99), 4),
+                "peak_kib": round(statistics.median(peaks) / 1024, 1),
+                "max_peak_kib": round(max(peaks) / 1024, 1),
+            }
+            print(f"{name:<28} {p50:>9.3f} {p95:>9.3f} {p99:>9.3f} {statistics.median(peaks) / 1024:>9.1f}")
+
+    return results
+
+def compare_results(baseline, current, threshold=0.20, min_ms=0.01, min_kib=4.0):
+    """
+    Flag stages that got slower or allocate more than in the baseline.
+
+    A stage regresses when its p50 grew by more than threshold (and by at
+    least min_ms), or its median peak allocation grew by more than
+    threshold (and by at least min_kib). The tails are too noisy between
+    runs to gate on, and the absolute floors keep timer noise on
+    microsecond stages from counting. A baseline stage that the current
+    run doesn't have (skipped or removed) regresses too.
+
+    Returns:
+        List of (stage, metric, baseline value, current value); missing
+        stages have metric "missing" and current value None
+    """
+    regressions = []
+    print(f"{'stage':<28} {'base p50':>9} {'p50':>9} {'change':>8} {'base KiB':>9} {'KiB':>9}")
+    for name, now in current["stages"].items():
+        before = baseline["stages"].get(name)
+        if before is None:
+            print(f"{name:<28} {'':>9} {now['p50_ms']:>9.3f} {'new':>8}")
+            continue
+
+        flagged = []
+        for metric, floor in (("p50_ms", min_ms), ("peak_kib", min_kib)):
+            old, new = before[metric], now[metric]
+            if new > old * (1 + threshold) and new - old >= floor:
+                flagged.append(metric)
+                regressions.append((name, metric, old, new))
+
+        change = (now["p50_ms"] / before["p50_ms"] - 1) * 100 if before["p50_ms"] else 0.0
+        mark = "  ⚠️ " + ", ".join(flagged) if flagged else ""
+        print(f"{name:<28} {before['p50_ms']:>9.3f} {now['p50_ms']:>9.3f} {change:>+7.1f}% "
+              f"{before['peak_kib']:>9.1f} {now['peak_kib']:>9.1f}{mark}")
+
+    skipped = current.get("skipped", {})
+    for name, before in baseline["stages"].items():
+        if name not in current["stages"]:
+            regressions.append((name, "missing", before["p50_ms"], None))
+            reason = f"skipped ({skipped[name]})" if name in skipped else "not run"
+            print(f"{name:<28} {before['p50_ms']:>9.3f} {'':>9} {'missing':>8}  ⚠️  {reason}")
+
+    if regressions:
+        print(f"⚠️  {len(regressions)} regression(s) beyond {threshold:.0%}")
+    else:
+        print(f"✅ No regressions beyond {threshold:.0%}")
+    return regressions
+
+def main():
+    """Main function for command line usage."""
+    parser = argparse.ArgumentParser(description='Benchmark the z3 solver encodings or the input schedule')
+    parser.add_argument('-t', '--trials', type=int, default=5,
+                        help='Random boards per pair count (default: 5)')
+    parser.add_argument('-s', '--size', type=int, default=6,
+                        help='Size of the puzzle grid (default: 6 for 6x6)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Random seed for the boards (default: 0)')
+    parser.add_argument('--input', action='store_true',
+                        help='Measure wires/s of the automation event schedule instead')
+    parser.add_argument('--event-delay', type=float, default=automation.DEFAULT_DELAY,
+                        help=f'Pause after each drag step for --input (default: {automation.DEFAULT_DELAY})')
+    parser.add_argument('--settle', type=float, default=automation.DEFAULT_SETTLE,
+                        help=f'Pause around mouse down/up for --input (default: {automation.DEFAULT_SETTLE})')
+    parser.add_argument('--stages', action='store_true',
+                        help='Time every pipeline stage over a fixed board corpus instead')
+    parser.add_argument('--boards', type=int, default=30,
+                        help='Rendered random boards in the --stages corpus (default: 30)')
+    parser.add_argument('--corpus', nargs='*', default=[],
+                        help='Recorded region captures to add to the --stages corpus '
+                             '(files, directories or glob patterns)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Timed passes over the --stages corpus (default: 5)')
+    parser.add_argument('--save', metavar='FILE',
+                        help='Write the --stages results to a JSON file')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='Compare the --stages results with a saved JSON file, exit 1 on regressions')
+    parser.add_argument('--against', metavar='FILE',
+                        help='With --compare, compare this saved JSON file instead of running')
+    parser.add_argument('--threshold', type=float, default=0.20,
+                        help='Relative p50 slowdown or allocation growth that counts as a regression '
+                             '(default: 0.20)')
+
+    args = parser.parse_args()
+    if args.stages or args.compare:
+        if args.against:
+            with open(args.against) as f:
+                results = json.load(f)
+        else:
+            corpus = stage_corpus(boards=args.boards, grid_size=args.size, seed=args.seed,
+                                  recorded=batch.find_images(args.corpus))
+            results = bench_stages(corpus, repeat=args.repeat, grid_size=args.size)
+        if args.save:
+            with open(args.save, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"Saved {args.save}")
+        if args.compare:
+            with open(args.compare) as f:
+                baseline = json.load(f)
+            if compare_results(baseline, results, threshold=args.threshold):
+                sys.exit(1)
+    elif args.input:
+        bench_input(trials=args.trials, grid_size=args.size, seed=args.seed,
+                    delay=args.event_delay, settle=args.settle)
+    else:
+        bench_encodings(trials=args.trials, grid_size=args.size, seed=args.seed)
+
+if __name__ == "__main__":
+    main()
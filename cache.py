@@ -0,0 +1,201 @@
+"""
+Persistent solution cache.
+
+Solved puzzles are stored in SQLite, keyed by the endpoint layout
+normalized under the 8 symmetries of the square grid, so a rotated or
+mirrored repeat of a board is a hit too. The whole table is mirrored in
+memory, which makes a hit a dictionary lookup; last-used times of hits
+are only written back on the next eviction or on close().
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_PATH = "solutions.db"
+
+def _symmetries(grid_size):
+    """The 8 rotations/reflections of the grid as (x, y) -> (x, y) functions."""
+    n = grid_size - 1
+    return [
+        lambda x, y: (x, y),
+        lambda x, y: (n - x, y),
+        lambda x, y: (x, n - y),
+        lambda x, y: (n - x, n - y),
+        lambda x, y: (y, x),
+        lambda x, y: (n - y, x),
+        lambda x, y: (y, n - x),
+        lambda x, y: (n - y, n - x),
+    ]
+
+def _inverse(transform, grid_size):
+    """Inverse of one of the grid symmetries, as a lookup table."""
+    table = {}
+    for x in range(grid_size):
+        for y in range(grid_size):
+            table[transform(x, y)] = (x, y)
+    return lambda x, y: table[(x, y)]
+
+def canonical_form(pairs, grid_size=6, fill=False):
+    """
+    Normalize a puzzle under the grid symmetries.
+
+    Args:
+        pairs: List of coordinate pairs [[(x1,y1), (x2,y2)], ...]
+        grid_size: Size of the square grid
+        fill: Whether the solution has to cover every cell
+
+    Returns:
+        (key, transform, canonical_pairs): the signature string, the
+        symmetry mapping input coordinates to canonical ones, and the
+        pairs in canonical coordinates and order
+    """
+    best = None
+    for transform in _symmetries(grid_size):
+        canonical = sorted(sorted([transform(*a), transform(*b)]) for a, b in pairs)
+        body = ";".join(f"{x1},{y1},{x2},{y2}" for (x1, y1), (x2, y2) in canonical)
+        key = f"{grid_size}|{int(fill)}|{body}"
+        if best is None or key < best[0]:
+            best = (key, transform, canonical)
+    return best
+
+def to_canonical(paths, transform, canonical):
+    """
+    Move a solution into canonical coordinates and canonical pair order.
+
+    Args:
+        paths: Paths in the caller's coordinates, one per pair
+        transform, canonical: As returned by canonical_form()
+    """
+    by_pair = {}
+    for path in paths:
+        moved = [transform(x, y) for x, y in path]
+        by_pair[frozenset((moved[0], moved[-1]))] = moved
+    return [by_pair[frozenset((a, b))] for a, b in canonical]
+
+def from_canonical(pairs, stored, transform, canonical, grid_size=6):
+    """
+    Map a canonical solution back to the caller's pairs.
+
+    Returns:
+        One path per entry of pairs, running from its first to its second
+        endpoint, in the caller's coordinates
+    """
+    inverse = _inverse(transform, grid_size)
+    index = {frozenset(pair): i for i, pair in enumerate(canonical)}
+
+    paths = []
+    for a, b in pairs:
+        start = transform(*a)
+        path = [tuple(step) for step in stored[index[frozenset((start, transform(*b)))]]]
+        if path[0] != start:
+            path.reverse()
+        paths.append([inverse(x, y) for x, y in path])
+    return paths
+
+class SolutionCache:
+    """
+    SQLite-backed LRU cache of solved puzzles.
+
+    Args:
+        path: Database file (default solutions.db)
+        max_entries: Least recently used entries beyond this are evicted
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS solutions ("
+                         "key TEXT PRIMARY KEY, paths TEXT NOT NULL, last_used REAL NOT NULL)")
+        self._db.commit()
+
+        # In-memory mirror, least recently used first
+        self._entries = OrderedDict()
+        # Last-used times of hits not yet written to the database
+        self._touched = {}
+        for key, paths in self._db.execute("SELECT key, paths FROM solutions ORDER BY last_used"):
+            self._entries[key] = json.loads(paths)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, pairs, grid_size=6, fill=False):
+        """
+        Look up a solution for pairs.
+
+        Returns:
+            List of paths in the same format as solver.solve(), or None
+        """
+        key, transform, canonical = canonical_form(pairs, grid_size, fill)
+
+        with self._lock:
+            stored = self._entries.get(key)
+            if stored is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            self._touched[key] = time.time()
+
+        return from_canonical(pairs, stored, transform, canonical, grid_size)
+
+    def put(self, pairs, paths, grid_size=6, fill=False):
+        """
+        Store a complete solution for pairs. Incomplete solutions are ignored.
+        """
+        if not paths or not all(paths):
+            return
+
+        key, transform, canonical = canonical_form(pairs, grid_size, fill)
+        stored = to_canonical(paths, transform, canonical)
+
+        with self._lock:
+            self._entries[key] = stored
+            self._entries.move_to_end(key)
+            self._touched.pop(key, None)
+            self._db.execute("INSERT OR REPLACE INTO solutions (key, paths, last_used) VALUES (?, ?, ?)",
+                             (key, json.dumps(stored), time.time()))
+
+            # LRU eviction
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+            if evicted:
+                for k in evicted:
+                    self._touched.pop(k, None)
+                self._db.executemany("DELETE FROM solutions WHERE key = ?", [(k,) for k in evicted])
+                self._write_touched()
+            self._db.commit()
+
+    def _write_touched(self):
+        """Write pending last-used times; the caller holds the lock and commits."""
+        if self._touched:
+            self._db.executemany("UPDATE solutions SET last_used = ? WHERE key = ?",
+                                 [(used, key) for key, used in self._touched.items()])
+            self._touched.clear()
+
+    def stats(self):
+        """Hit/miss counters as a dict."""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        """Write pending last-used times and close the database."""
+        with self._lock:
+            self._write_touched()
+            self._db.commit()
+            self._db.close()
@@ -0,0 +1,133 @@
+"""
+Automation timing calibration.
+
+With an unsolved puzzle on screen, calibrate() solves it, then repeatedly
+draws every wire but one (so the puzzle never completes), checks the
+result by capture, and resets the wires by clicking their starts. The
+settle time is lowered first, then the per-step delay, until a drawing
+fails. The fastest timing that passed every trial, plus a safety margin,
+is written to the profile that automation.get_backend() loads.
+"""
+
+import logging
+import time
+
+import automation
+import planner
+import solver
+import vision
+
+log = logging.getLogger(__name__)
+
+# Candidate timings in seconds, slowest first
+SETTLE_STEPS = (0.016, 0.012, 0.008, 0.006, 0.004, 0.003, 0.002, 0.001, 0.0)
+DELAY_STEPS = (0.008, 0.006, 0.004, 0.003, 0.002, 0.001, 0.0005, 0.0)
+
+class CalibrationError(Exception):
+    """The puzzle on screen can't be used for calibration."""
+
+def _grid(capture, grid_size, sample=None):
+    frame = capture()
+    grid = sample(frame) if sample is not None else vision.to_grid(frame, grid_size=grid_size)
+    return vision.clean_black(grid)
+
+def _reset(wires, config, grid_size, backend, capture, sample):
+    """Clear drawn wires by clicking their starts, and check the board is fresh again."""
+    for _ in range(2):
+        for _, path in wires:
+            x, y = automation.pos_to_screen_pos(path[0], config, grid_size)
+            backend.send([("move", x, y, automation.DEFAULT_SETTLE),
+                          ("down", x, y, automation.DEFAULT_SETTLE),
+                          ("up", x, y, automation.DEFAULT_SETTLE)])
+        time.sleep(automation.VERIFY_WAIT)
+        if vision.is_fresh_puzzle(_grid(capture, grid_size, sample)):
+            return
+    raise CalibrationError("Could not reset the test wires")
+
+def _passes(backend, reset_backend, wires, solutions, expected, config, grid_size, capture, sample,
+            trials):
+    """Draw the test wires trials times with the backend's timing; True if all took."""
+    drawn = {i for i, _ in wires}
+    for _ in range(trials):
+        automation.complete_solve(iter(wires), config, grid_size, backend=backend)
+        time.sleep(automation.VERIFY_WAIT)
+        broken = automation.broken_wires(_grid(capture, grid_size, sample), solutions, expected, grid_size)
+        if broken is None:
+            raise CalibrationError("The puzzle closed during calibration")
+        _reset(wires, config, grid_size, reset_backend, capture, sample)
+        if drawn.intersection(broken):
+            return False
+    return True
+
+def calibrate(config, capture, grid_size=6, backend_name="auto", trials=2, margin=1.25,
+              path=automation.PROFILE_PATH, sample=None):
+    """
+    Find the fastest reliable drawing timing and save it to the profile.
+
+    Args:
+        config: [region_x, region_y, region_height] for screen positioning
+        capture: Callable returning a fresh frame of the puzzle region
+        grid_size: Size of the puzzle grid (default 6 for 6x6)
+        backend_name: Input backend to calibrate, one of automation.BACKENDS
+        trials: Drawings that must all succeed for a timing to pass
+        margin: Factor applied to the fastest passing timing
+        path: Profile file to update
+        sample: Callable turning a frame into the NxN color grid (default
+            vision.to_grid)
+
+    Returns:
+        (delay, settle) written to the profile
+    """
+    backend = automation.get_backend(backend_name, automation.DEFAULT_DELAY, automation.DEFAULT_SETTLE)
+    # Resets always run at the safe default timing
+    reset_backend = automation.get_backend(backend.name, automation.DEFAULT_DELAY, automation.DEFAULT_SETTLE)
+
+    expected = _grid(capture, grid_size, sample)
+    if not vision.is_fresh_puzzle(expected):
+        raise CalibrationError("Open an unsolved puzzle before calibrating")
+    pairs = vision.match(expected, grid_size=grid_size)
+    if len(pairs) < 2:
+        raise CalibrationError("Calibration needs a puzzle with at least two wires")
+    solutions = solver.solve(pairs, grid_size=grid_size, engine="bitboard")
+    if not all(solutions):
+        raise CalibrationError("Could not solve the puzzle on screen")
+
+    # Leave one wire out so the puzzle never completes
+    wires = planner.plan(solutions)[:-1]
+    log.info("🎯 Calibrating %s with %d test wires, %d trials per timing", backend.name, len(wires), trials)
+
+    def search(steps, apply):
+        best = None
+        for value in steps:
+            apply(value)
+            ok = _passes(backend, reset_backend, wires, solutions, expected, config, grid_size,
+                         capture, sample, trials)
+            log.info("   delay %.1f ms, settle %.1f ms: %s",
+                     backend.delay * 1000, backend.settle * 1000, "ok" if ok else "failed")
+            if not ok:
+                break
+            best = value
+        if best is None:
+            raise CalibrationError("Even the slowest timing failed, check the region config")
+        apply(best)
+        return best
+
+    backend.delay = DELAY_STEPS[0]
+    settle = search(SETTLE_STEPS, lambda value: setattr(backend, "settle", value))
+    if backend.name == "pyautogui":
+        # pyautogui's drag steps only wait for its PAUSE, which is the settle time
+        delay = backend.delay
+    else:
+        delay = search(DELAY_STEPS, lambda value: setattr(backend, "delay", value))
+
+    delay, settle = delay * margin, settle * margin
+    profile = automation.load_profile(path)
+    profile[backend.name] = {
+        "delay": round(delay, 5),
+        "settle": round(settle, 5),
+        "calibrated": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    automation.save_profile(profile, path)
+    log.info("✅ Saved %s timing to %s: delay %.2f ms, settle %.2f ms",
+             backend.name, path, delay * 1000, settle * 1000)
+    return delay, settle
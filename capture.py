@@ -0,0 +1,159 @@
+"""
+Long-lived screen capture for the puzzle region.
+
+vision.capture_screen opens and closes an mss handle on every call.
+RegionCapture keeps one open per thread, and can pre-arm a background thread
+that grabs the region at a fixed rate into a ring buffer so a solve can start
+from the newest frame without waiting for a capture.
+
+Given a grid_size it grabs only the center band of each cell row, the rows
+to_grid() and vision.ProbeSampler actually read, which cuts the pixels
+copied per capture roughly in half. Such frames must be sampled with
+vision.ProbeSampler(strips=True).
+"""
+
+import threading
+import time
+
+import mss
+import numpy as np
+
+import vision
+
+class RegionCapture:
+    """
+    Persistent capture of the configured puzzle region.
+
+    Args:
+        config: [region_x, region_y, region_height] as used by main.py
+        ring_size: Frames kept by the background thread (default 3)
+        grid_size: Grab only the cell-center band of each of the grid's rows
+            (default None, the whole region)
+        border_percent: Border cut off each cell, as for vision.to_grid()
+    """
+
+    def __init__(self, config, ring_size=3, grid_size=None, border_percent=0.26):
+        region_x, region_y, region_height = config[0], config[1], config[2]
+        region_width = region_height  # Square region
+        self.monitor = {"left": region_x, "top": region_y, "width": region_width, "height": region_height}
+
+        if grid_size is None:
+            self._monitors = [self.monitor]
+        else:
+            self._monitors = [{"left": region_x, "top": region_y + top, "width": region_width,
+                               "height": bottom - top}
+                              for top, bottom in vision.cell_bounds(region_height, grid_size, border_percent)]
+        self.shape = (sum(m["height"] for m in self._monitors), region_width, 3)
+
+        self._ring = np.zeros((ring_size,) + self.shape, dtype=np.uint8)
+        self._stamps = [0.0] * ring_size
+        self._latest = -1
+        self._lock = threading.Lock()
+
+        # mss handles must be used from the thread that opened them
+        self._local = threading.local()
+        self._handles = []
+
+        self._thread = None
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _handle(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = mss.mss()
+            self._local.sct = sct
+            with self._lock:
+                self._handles.append(sct)
+        return sct
+
+    def grab(self):
+        """
+        Capture the region now.
+
+        Returns:
+            HxWx3 RGB array viewing the grab buffer (see vision.bgra_to_rgb),
+            or the stacked bands when capturing strips
+        """
+        sct = self._handle()
+        if len(self._monitors) == 1:
+            screenshot = sct.grab(self.monitor)
+            return vision.bgra_to_rgb(screenshot.raw, screenshot.width, screenshot.height)
+
+        # Stack the raw BGRA bands, which is a plain memory copy per band,
+        # and view the result as RGB like a whole-region grab
+        height, width = self.shape[:2]
+        frame = np.empty(height * width * 4, dtype=np.uint8)
+        start = 0
+        for monitor in self._monitors:
+            raw = sct.grab(monitor).raw
+            frame[start:start + len(raw)] = np.frombuffer(raw, dtype=np.uint8)
+            start += len(raw)
+        return vision.bgra_to_rgb(frame, width, height)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, fps=30):
+        """Start grabbing into the ring buffer at fps frames per second."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(1.0 / fps,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread, if running."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, interval):
+        ring_size = len(self._ring)
+        next_time = time.perf_counter()
+        while not self._stop.is_set():
+            frame = self.grab()
+            slot = (self._latest + 1) % ring_size
+            np.copyto(self._ring[slot], frame)
+            with self._lock:
+                self._stamps[slot] = time.perf_counter()
+                self._latest = slot
+
+            next_time += interval
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                # Fell behind, don't try to catch up with a burst of grabs
+                next_time = time.perf_counter()
+
+    def latest(self, max_age=None):
+        """
+        Newest frame of the region.
+
+        Returns a copy of the newest ring buffer frame when the background
+        thread is running, otherwise (or if that frame is older than
+        max_age seconds) grabs synchronously.
+        """
+        with self._lock:
+            slot = self._latest
+            stamp = self._stamps[slot] if slot >= 0 else 0.0
+            if self.running and slot >= 0 and (max_age is None or time.perf_counter() - stamp <= max_age):
+                return self._ring[slot].copy()
+        return self.grab()
+
+    def close(self):
+        """Stop the background thread and release every mss handle."""
+        self.stop()
+        with self._lock:
+            for sct in self._handles:
+                sct.close()
+            self._handles = []
+        self._local = threading.local()
@@ -0,0 +1,341 @@
+"""
+Automatic detection of the puzzle region.
+
+locate() finds the generator grid in a full-screen frame (as screenshot.py
+captures) by edge projection: strong intensity steps are counted per
+column and per row, and the grid is where grid_size + 1 evenly spaced
+lines with the same pitch line up on both axes. Every candidate size is
+scored with whole-profile array sums, first on a downsampled frame, then
+around the best size at full resolution. A grid with another line one
+pitch outside it is part of a bigger grid and is rejected.
+
+RegionLocator keeps the found region and the colors of a few pixels where
+the grid lines cross the sampled band of each cell row. check() compares a
+region capture against them, and the screen is only scanned again when
+that check fails.
+"""
+
+import logging
+import time
+
+import mss
+import numpy as np
+
+import vision
+
+log = logging.getLogger(__name__)
+
+# Summed RGB step that counts as an edge
+EDGE_THRESHOLD = 24
+# Smallest cell pitch searched, in pixels
+MIN_CELL = 16
+# Weakest of the grid lines must span this share of the grid size
+MIN_COVERAGE = 0.5
+# Profile entries pooled into one for the first, every-size search
+POOL = 4
+# Coarse hits checked at full resolution
+CANDIDATES = 4
+# Summed RGB difference and share of check pixels for check() to pass
+CHECK_TOLERANCE = 30
+CHECK_SHARE = 0.8
+# Least seconds between two screen scans by relocate(), doubled after every
+# scan that finds nothing up to the longest wait
+RELOCATE_INTERVAL = 1.0
+MAX_RELOCATE_INTERVAL = 8.0
+
+def _gray(pixels):
+    """Summed RGB as int16; adding channel by channel is much faster than sum(axis=2)."""
+    gray = pixels[:, :, 0].astype(np.int16)
+    gray += pixels[:, :, 1]
+    gray += pixels[:, :, 2]
+    return gray
+
+def _profile(gray, run):
+    """
+    Line pixel count per column; entry i is the step from column i to i + 1.
+
+    A pixel counts when it is part of a run of at least run rows where the
+    step is an edge of the same sign, so noise and text don't add up.
+    """
+    steps = np.diff(gray, axis=1)
+    length = len(steps) - run + 1
+    if length <= 0:
+        return np.zeros(steps.shape[1], dtype=np.int64)
+    total = 0
+    for edges in (steps > EDGE_THRESHOLD, steps < -EDGE_THRESHOLD):
+        starts = edges[:length].copy()
+        for k in range(1, run):
+            starts &= edges[k:k + length]
+        lines = np.zeros_like(edges)
+        for k in range(run):
+            lines[k:k + length] |= starts
+        total = total + lines.sum(axis=0)
+    return total
+
+def _profiles(pixels, step=2):
+    """
+    Column and row line profiles of a frame, in pixels.
+
+    Lines are only thinned along their own direction: the column profile
+    reads every step-th row, the row profile every step-th column.
+    """
+    run = max(MIN_CELL // 2 // step, 1)
+    columns = _profile(_gray(pixels[::step]), run) * step
+    rows = _profile(np.ascontiguousarray(_gray(pixels[:, ::step]).T), run) * step
+    return columns, rows
+
+def _pool(profile, factor):
+    """Max over blocks of factor entries, so thin lines survive downsampling."""
+    usable = len(profile) // factor * factor
+    return profile[:usable].reshape(-1, factor).max(axis=1)
+
+def _dilate(profile, radius=2):
+    """Max over each index and radius neighbours, so lines a little off still count."""
+    dilated = profile.copy()
+    for shift in range(1, radius + 1):
+        dilated[shift:] = np.maximum(dilated[shift:], profile[:-shift])
+        dilated[:-shift] = np.maximum(dilated[:-shift], profile[shift:])
+    return dilated
+
+def _best_lines(profile, sizes, grid_size, factor=1, clip=True):
+    """
+    Best offset for every candidate grid size along one axis.
+
+    Args:
+        factor: Pixels per profile entry
+        clip: Count at most the grid size per line; whole-screen profiles
+            also count other content above and below the grid
+
+    Returns:
+        (span, offset) arrays over sizes; span is the weakest of the
+        grid_size + 1 lines in line pixels
+    """
+    dilated = _dilate(profile).astype(np.int64)
+    spans = np.zeros(len(sizes), dtype=np.int64)
+    offsets = np.zeros(len(sizes), dtype=np.int64)
+    for i, size in enumerate(sizes):
+        pitch = size / grid_size
+        positions = [int(round(k * pitch)) for k in range(grid_size + 1)]
+        count = len(dilated) - positions[-1]
+        if count <= 0:
+            continue
+        length = size * factor
+        if clip:
+            lines = [np.minimum(dilated[p:p + count], length) for p in positions]
+        else:
+            lines = [dilated[p:p + count] for p in positions]
+        weakest = np.minimum.reduce(lines)
+        # Ties on the weakest line go to the most line pixels overall
+        best = int(np.argmax(weakest * ((grid_size + 1) * int(dilated.max()) + 1) + np.add.reduce(lines)))
+        spans[i] = weakest[best]
+        offsets[i] = best
+    return spans, offsets
+
+def _extends(profile, offset, size, grid_size):
+    """
+    Whether a line as strong as MIN_COVERAGE of the size sits about one
+    pitch before or after the grid_size + 1 lines at offset: a bigger grid
+    with the same pitch, whose inner lines would fit as well. The found
+    size can be a few pixels off, so the line may be a tenth of a pitch
+    away from where the pitch puts it.
+    """
+    pitch = size / grid_size
+    slack = max(2, int(pitch / 10))
+    for position in (offset - int(round(pitch)), offset + int(round((grid_size + 1) * pitch))):
+        near = profile[max(position - slack, 0):max(position + slack + 1, 0)]
+        if len(near) and min(int(near.max()), size) >= size * MIN_COVERAGE:
+            return True
+    return False
+
+def _search(columns, rows, sizes, grid_size, factor=1, clip=True, count=1):
+    """
+    Best grids among sizes, scored by their weakest line on either axis.
+
+    Scores are in pixels rather than a share of the size, so small grids
+    that fit into other content don't outscore the real one, and ties go
+    to the largest size so thick outer lines end up inside the grid.
+
+    Returns:
+        Up to count (score, size, x, y) tuples in profile units, best first
+    """
+    sizes = [s for s in sizes if 0 < s < min(len(columns), len(rows))][::-1]
+    if not sizes:
+        return []
+    x_spans, x_offsets = _best_lines(columns, sizes, grid_size, factor, clip)
+    y_spans, y_offsets = _best_lines(rows, sizes, grid_size, factor, clip)
+    scores = np.minimum(x_spans, y_spans)
+    best = np.argsort(-scores, kind="stable")[:count]
+    return [(int(scores[i]), sizes[i], int(x_offsets[i]) + 1, int(y_offsets[i]) + 1) for i in best]
+
+def locate(frame, grid_size=6):
+    """
+    Find the puzzle grid in a screen capture.
+
+    Args:
+        frame: PIL image or HxWx3 array of the whole screen
+        grid_size: Size of the puzzle grid (default 6 for 6x6)
+
+    Returns:
+        [x, y, size] of the grid in frame pixels, the same form as the -c
+        config, or None if no grid was found
+    """
+    pixels = np.asarray(frame)[:, :, :3]
+
+    # Every size on profiles pooled to a quarter of the resolution first.
+    # Whole-screen profiles mix in other content, so keep a few candidates
+    columns, rows = _profiles(pixels)
+    sizes = range(grid_size * MIN_CELL // POOL, min(pixels.shape[:2]) // POOL)
+    candidates = []
+    for candidate in _search(_pool(columns, POOL), _pool(rows, POOL), sizes, grid_size, POOL,
+                             count=CANDIDATES * 8):
+        # Neighbouring sizes at the same spot refine to the same grid
+        if all(max(abs(a - b) for a, b in zip(candidate[1:], kept[1:])) > 3 for kept in candidates):
+            candidates.append(candidate)
+        if len(candidates) == CANDIDATES:
+            break
+
+    # Then the sizes around each at full resolution, with profiles of just
+    # a window around it so both axes have to agree
+    best = None
+    for _, size, x, y in candidates:
+        size, x, y = size * POOL, x * POOL, y * POOL
+        margin = size // grid_size + 4 * POOL
+        top, left = max(y - margin, 0), max(x - margin, 0)
+        window = pixels[top:y + size + margin, left:x + size + margin]
+        columns, rows = _profiles(window)
+        found = _search(columns, rows, range(size - 3 * POOL, size + 3 * POOL + 1), grid_size, clip=True)
+        if not found:
+            continue
+        score, size, x, y = found[0]
+        if score < size * MIN_COVERAGE:
+            continue
+        if _extends(columns, x - 1, size, grid_size) or _extends(rows, y - 1, size, grid_size):
+            log.debug("Grid at (%d, %d), size %d has more lines around it", left + x, top + y, size)
+            continue
+        if best is None or score > best[0]:
+            best = (score, left + x, top + y, size)
+
+    if best is None:
+        return None
+    score, x, y, size = best
+    log.debug("Grid at (%d, %d), size %d, weakest line %d px", x, y, size, score)
+    return [x, y, size]
+
+class RegionLocator:
+    """
+    Cached puzzle region that follows the grid around the screen.
+
+    Args:
+        grid_size: Size of the puzzle grid (default 6 for 6x6)
+        border_percent: Border cut off each cell, as for vision.to_grid()
+        monitor: mss monitor index to scan (default 1, the primary screen)
+        interval: Least seconds between two screen scans by relocate()
+        max_interval: Longest wait relocate() backs off to while scans find
+            nothing
+    """
+
+    def __init__(self, grid_size=6, border_percent=0.26, monitor=1, interval=RELOCATE_INTERVAL,
+                 max_interval=MAX_RELOCATE_INTERVAL):
+        self.grid_size = grid_size
+        self.border_percent = border_percent
+        self.monitor = monitor
+        self.interval = interval
+        self.max_interval = max_interval
+        self.region = None
+        self._last_scan = None
+        self._wait = interval
+        self._points = None
+
+    def grab(self):
+        """Full-screen frame of the monitor and its (left, top) on the desktop."""
+        with mss.mss() as sct:
+            monitor = sct.monitors[self.monitor]
+            screenshot = sct.grab(monitor)
+        frame = vision.bgra_to_rgb(screenshot.raw, screenshot.width, screenshot.height)
+        return frame, (monitor["left"], monitor["top"])
+
+    def locate(self, frame=None, origin=(0, 0)):
+        """
+        Scan a full-screen frame for the grid and remember it.
+
+        Args:
+            frame: Screen capture, or None to grab the monitor now
+            origin: Desktop (left, top) of frame's first pixel
+
+        Returns:
+            [x, y, size] on the desktop, or None if no grid was found (the
+            previous region is kept)
+        """
+        if frame is None:
+            frame, origin = self.grab()
+        self._last_scan = time.perf_counter()
+        found = locate(frame, self.grid_size)
+        if found is None:
+            self._wait = min(self._wait * 2, self.max_interval)
+            return None
+        self._wait = self.interval
+
+        x, y, size = found
+        self._record(np.asarray(frame)[y:y + size, x:x + size, :3], size)
+        self.region = [origin[0] + x, origin[1] + y, size]
+        return self.region
+
+    def relocate(self):
+        """
+        locate() unless the last scan was too recent.
+
+        The wait starts at interval and doubles after every scan that finds
+        nothing, up to max_interval, so a watcher with no puzzle open scans
+        the screen a few times a minute instead of every second.
+        """
+        if self._last_scan is not None and time.perf_counter() - self._last_scan < self._wait:
+            return None
+        return self.locate()
+
+    def _record(self, region, size):
+        # Each grid line, and a pixel just inside the cell after it, where
+        # the line crosses the first sampled row or column of each cell:
+        # clear of wires and dots. Strip captures hold the crossings with
+        # the vertical lines; a vertical shift they miss is one the sampled
+        # band still tolerates
+        bounds = vision.cell_bounds(size, self.grid_size, self.border_percent)
+        pitch = size / self.grid_size
+        inset = max(2, int(pitch * 0.1))
+        lines = []
+        for i in range(self.grid_size + 1):
+            line = min(int(round(i * pitch)), size - 1)
+            lines.append(line)
+            if i < self.grid_size:
+                lines.append(line + inset)
+        lines = np.array(lines)[None, :]
+        starts = np.array([start for start, _ in bounds])[:, None]
+
+        heights = [stop - start for start, stop in bounds]
+        strip_starts = np.concatenate([[0], np.cumsum(heights)[:-1]])[:, None]
+        vertical = region[starts, lines].astype(np.int16)
+        horizontal = region[lines.T, starts.T].astype(np.int16)
+        self._points = {
+            size: [(starts, lines, vertical), (lines.T, starts.T, horizontal)],
+            sum(heights): [(strip_starts, lines, vertical)],
+        }
+
+    def check(self, frame):
+        """
+        Whether a capture of the cached region still shows the grid there.
+
+        Args:
+            frame: Region capture, whole or strips (capture.RegionCapture)
+
+        Returns:
+            False if nothing was located yet, the frame doesn't fit the
+            region, or too many of the recorded pixels changed
+        """
+        if self._points is None:
+            return False
+        pixels = np.asarray(frame)
+        points = self._points.get(pixels.shape[0])
+        if points is None or pixels.shape[1] != self.region[2]:
+            return False
+        matches = [np.abs(pixels[rows, columns, :3].astype(np.int16) - colors).sum(axis=-1) <= CHECK_TOLERANCE
+                   for rows, columns, colors in points]
+        return bool(np.concatenate([m.ravel() for m in matches]).mean() >= CHECK_SHARE)
@@ -0,0 +1,50 @@
+"""
+Console logging for the solver.
+
+Modules log through logging.getLogger(__name__). setup() routes every
+record through a QueueHandler, so the thread that logs only pays for a
+queue put, and a QueueListener thread writes the records to the console.
+Messages use %-style arguments, so records below the level are never
+formatted.
+
+    INFO   stage progress and results (default)
+    DEBUG  per-path and per-event detail (--verbose)
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+
+_listener = None
+
+def setup(verbose=False):
+    """
+    Configure the root logger once.
+
+    Args:
+        verbose: Also show DEBUG records, e.g. every drag step
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    records = queue.SimpleQueue()
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter("%(message)s"))
+
+    root = logging.getLogger()
+    root.handlers[:] = [logging.handlers.QueueHandler(records)]
+    root.setLevel(logging.DEBUG if verbose else logging.INFO)
+
+    _listener = logging.handlers.QueueListener(records, console)
+    _listener.start()
+    atexit.register(shutdown)
+
+def shutdown():
+    """Write out queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
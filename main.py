@@ -15,6 +15,15 @@ by clicking on a tile that the wire is on.
 import vision
 import solver
 import automation
+import cache
+import table
+import capture
+import pipeline
+import planner
+import calibrate
+import locator
+import logs
+import logging
 import time
 import base64
 import argparse
@@ -23,22 +32,78 @@ from pynput.keyboard import Key, KeyCode
 import tkinter as tk
 from tkinter import Canvas
 import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Parse command line arguments
 parser = argparse.ArgumentParser(description='Roblox Forsaken Generator Puzzle Solver')
-parser.add_argument('-c', '--config', required=True,
-                    help='Config string: i|x|y|size or b<base64>')
+parser.add_argument('-c', '--config', default='auto',
+                    help='Config string: i|x|y|size, b<base64>, or auto to find the puzzle on screen '
+                         '(default: auto)')
 parser.add_argument('-a', '--auto', action='store_true',
                     help='Enable automation (if not set, only shows overlay)')
 parser.add_argument('-s', '--size', type=int, default=6,
                     help='Size of the puzzle grid (default: 6 for 6x6)')
+parser.add_argument('-e', '--engine', choices=solver.ENGINES, default='bitboard',
+                    help='Solver engine (default: bitboard, no z3 import needed)')
+parser.add_argument('--fill', action='store_true',
+                    help='Require the wires to cover every cell of the grid')
+parser.add_argument('--cache', default=cache.DEFAULT_PATH,
+                    help=f'Solution cache database (default: {cache.DEFAULT_PATH})')
+parser.add_argument('--no-cache', action='store_true',
+                    help='Always solve, never read or write the solution cache')
+parser.add_argument('--table', default=None,
+                    help='Precomputed solution table built with table.py (optional)')
+parser.add_argument('--prearm', type=int, default=0, metavar='FPS',
+                    help='Keep grabbing the region at FPS in the background so a solve '
+                         'starts from the latest frame (default: 0, capture on demand)')
+parser.add_argument('-w', '--watch', action='store_true',
+                    help='Watch the region and solve new puzzles automatically, no hotkey needed')
+parser.add_argument('--watch-interval', type=float, default=0.25, metavar='SECONDS',
+                    help='Seconds between watch mode samples (default: 0.25)')
+parser.add_argument('-i', '--input', choices=automation.BACKENDS, default='auto',
+                    help='Mouse injection backend (default: auto, the fastest available)')
+parser.add_argument('--event-delay', type=float, default=None, metavar='SECONDS',
+                    help=f'Pause after each drag step (default: calibrated, else {automation.DEFAULT_DELAY})')
+parser.add_argument('--settle', type=float, default=None, metavar='SECONDS',
+                    help=f'Pause around mouse down/up (default: calibrated, else {automation.DEFAULT_SETTLE})')
+parser.add_argument('--calibrate', action='store_true',
+                    help=f'Find the fastest reliable timing for the input backend on the unsolved '
+                         f'puzzle on screen, save it to {automation.PROFILE_PATH} and exit')
+parser.add_argument('--max-span', type=int, default=1, metavar='CELLS',
+                    help='Most cells one drag step may cover along a straight run, 0 for no limit '
+                         '(default: 1, a drag event for every cell)')
+parser.add_argument('--retries', type=int, default=1,
+                    help='Re-capture after drawing and redraw broken wires up to this many times, '
+                         '0 to skip the check (default: 1)')
+parser.add_argument('--full-sampling', action='store_true',
+                    help='Count every pixel of each cell center instead of sampling a few probe points')
+parser.add_argument('--strip-capture', action='store_true',
+                    help='Grab only the center band of each cell row instead of the whole region')
+parser.add_argument('-v', '--verbose', action='store_true',
+                    help='Log every solution path and drag step (slows automation down)')
+parser.add_argument('-d', '--debug', action='store_true',
+                    help='Save screenshot.png, processed.png and output.png on every solve')
 
 args = parser.parse_args()
+if args.strip_capture and args.full_sampling:
+    parser.error('--strip-capture frames can only be read by the probe sampler, drop --full-sampling')
 puzzle_size = args.size
 
+logs.setup(verbose=args.verbose)
+log = logging.getLogger(__name__)
+
 # Parse config
 config_input = args.config
-if config_input.startswith('i'):
+region_locator = None
+if config_input == 'auto':
+    # Find the grid on screen; it is followed if it moves later
+    region_locator = locator.RegionLocator(grid_size=puzzle_size)
+    config = region_locator.locate()
+    if config is None and (not args.watch or args.calibrate):
+        log.error("Could not find the puzzle on screen. Open a generator puzzle, or pass -c i|x|y|size")
+        logs.shutdown()
+        exit(1)
+elif config_input.startswith('i'):
     # Parse integer config: i|1227|700|916
     config_str = config_input[1:]  # Remove 'i'
     config = list(map(int, config_str.split('|')))
@@ -48,20 +113,99 @@ elif config_input.startswith('b'):
     decoded = base64.b64decode(config_str).decode('utf-8')
     config = list(map(int, decoded.split('|')))
 else:
-    print("Invalid config format. Use 'i|x|y|size' or 'b<base64>'")
+    log.error("Invalid config format. Use 'i|x|y|size', 'b<base64>' or 'auto'")
+    logs.shutdown()
     exit(1)
 
-print(f"Using config: {config}")
+if config is None:
+    log.info("👀 No puzzle on screen yet, watch mode will find it once it opens")
+else:
+    log.info("Using config: %s", config)
+
+solution_cache = None if args.no_cache else cache.SolutionCache(args.cache)
+solution_table = table.SolutionTable(args.table) if args.table else None
+
+def open_region(region):
+    """
+    Long-lived capture handle for a puzzle region, and its probe points
+    computed once (None with --full-sampling).
+    """
+    handle = capture.RegionCapture(region, grid_size=puzzle_size if args.strip_capture else None)
+    probes = None if args.full_sampling else vision.ProbeSampler(region[2], grid_size=puzzle_size,
+                                                                 strips=args.strip_capture)
+    return handle, probes
+
+# Both stay None until the puzzle is found when -c auto --watch starts
+# without one on screen
+screen, sampler = (None, None) if config is None else open_region(config)
+
+def sample_grid(frame):
+    """Dominant color per cell, from the probe sampler unless --full-sampling."""
+    if sampler is None:
+        return vision.to_grid(frame, grid_size=puzzle_size)
+    return sampler.sample(frame)
+
+# Held while follow_region() replaces the capture and sampler, and by a
+# solve job while it takes its first capture
+region_lock = threading.Lock()
+
+def follow_region(force=False):
+    """
+    Scan the screen for the puzzle after -c auto's region check failed (or
+    before it was ever found), and move the capture and sampler if it was
+    found somewhere else.
+
+    A running solve keeps using config, screen and sampler, so only the
+    solve itself may move them: without force, nothing is scanned while
+    the solve pipeline has a job running.
+
+    Args:
+        force: Scan even if the last scan was too recent (see
+            RegionLocator.relocate()) or a job is running (for the job's
+            own check)
+
+    Returns:
+        True if the puzzle was found
+    """
+    global config, screen, sampler
+    with region_lock:
+        if not force and solve_pipeline is not None and solve_pipeline.busy:
+            return False
+        region = region_locator.locate() if force else region_locator.relocate()
+        if region is None:
+            return False
+        if region != config:
+            if config is None:
+                log.info("📐 Found the puzzle at %s", region)
+            else:
+                log.info("📐 Puzzle moved to %s", region)
+                screen.close()
+            config = region
+            screen, sampler = open_region(config)
+            if args.prearm:
+                screen.start(fps=args.prearm)
+        return True
+
 if args.auto:
-    print("Auto mode enabled. Press Left Alt to start solving...")
+    log.info("Auto mode enabled. Press Left Alt to start solving...")
 else:
-    print("Overlay mode only. Automation disabled.")
+    log.info("Overlay mode only. Automation disabled.")
 
 # Create overlay window
 root = None
 overlay = None
 auto_mode = False
 
+# Worker running execute_solve, and the queue it uses to reach the Tk thread
+solve_pipeline = None
+ui = None
+
+# Mouse injection backend, created in main() when automation is enabled
+input_backend = None
+
+# Side work (PNG dumps, visualization) that must not delay automation
+background = ThreadPoolExecutor(max_workers=1, thread_name_prefix="background")
+
 class OverlayWindow(tk.Toplevel):
     """Overlay window class that inherits from tk.Toplevel."""
 
@@ -107,7 +251,7 @@ class OverlayWindow(tk.Toplevel):
         self.current_grid_size = 6
         self.resize_after_id = None  # For debouncing resize events
 
-        print(f"📱 Overlay created: {self.overlay_size}x{self.overlay_size} at ({x_position}, {y_position})")
+        log.info("📱 Overlay created: %dx%d at (%d, %d)", self.overlay_size, self.overlay_size, x_position, y_position)
 
     def on_window_resize(self, event):
         """Handle window resize events with debouncing."""
@@ -160,16 +304,17 @@ def create_overlay():
     status_text = overlay.status_text
 
 def update_overlay_status(message):
-    """Update the status text in overlay."""
+    """Update the status text in overlay. Safe to call from any thread."""
     if overlay and canvas:
-        canvas.itemconfig(status_text, text=message)
-        overlay.update()
+        ui.post(canvas.itemconfig, status_text, text=message)
 
 def draw_solution_in_overlay(solutions, processed_image=None, grid_size=6):
-    """Draw the solution paths in the overlay."""
-    if not overlay or not canvas:
-        return
+    """Draw the solution paths in the overlay. Safe to call from any thread."""
+    if overlay and canvas:
+        ui.post(_draw_solution_in_overlay, solutions, processed_image, grid_size)
 
+def _draw_solution_in_overlay(solutions, processed_image, grid_size):
+    """Tk-thread half of draw_solution_in_overlay()."""
     # Store current solutions for redrawing on resize
     overlay.current_solutions = solutions
     overlay.current_processed_image = processed_image
@@ -198,9 +343,9 @@ def draw_solution_in_overlay_internal(solutions, processed_image, grid_size, can
 
     # Function to get color from processed image
     def get_color_from_processed(x, y):
-        if processed_image and 0 <= x < grid_size and 0 <= y < grid_size:
+        if processed_image is not None and 0 <= x < grid_size and 0 <= y < grid_size:
             # Get pixel color from processed image
-            pixel_color = processed_image.getpixel((x, y))
+            pixel_color = vision.pixel_color(processed_image, x, y)
             # If the color is black, use a default color
             if pixel_color == (0, 0, 0):
                 return 'white'
@@ -266,57 +411,158 @@ def draw_solution_in_overlay_internal(solutions, processed_image, grid_size, can
 
 
 
-def execute_solve():
-    """Execute the complete solve pipeline."""
-    print("\n🚀 Starting solve process...")
+def execute_solve(token):
+    """
+    Execute the complete solve pipeline on the worker thread.
+
+    token.check() between stages abandons the run as soon as a newer
+    request arrives, so a stale solution is never drawn.
+    """
+    log.info("\n🚀 Starting solve process...")
     update_overlay_status("Starting...")
 
     # Capture screenshot and process
-    print("Taking screenshot...")
+    log.info("Taking screenshot...")
     update_overlay_status("Capturing...")
-    screenshot = vision.capture_screen(config)
-    screenshot.save("screenshot.png")
-
-    print("Processing image...")
+    with region_lock:
+        # Lets a relocation the watcher started finish first; the watcher
+        # leaves the region alone from here until this job returns
+        screenshot = None if screen is None else screen.latest()
+    if region_locator is not None and (screenshot is None or not region_locator.check(screenshot)):
+        if not follow_region(force=True):
+            log.warning("❌ Puzzle not found on screen")
+            update_overlay_status("Puzzle not found")
+            return
+        screenshot = screen.latest()
+    if args.debug:
+        background.submit(save_debug_image, screenshot, "screenshot.png")
+    token.check()
+
+    log.info("Processing image...")
     update_overlay_status("Processing...")
-    processed_image = vision.to_grid(screenshot, grid_size=puzzle_size)
-    processed_image = vision.clean_black(processed_image)
-    processed_image.save("processed.png")
-    print("Saved processed image to processed.png")
+    grid = sample_grid(screenshot)
+
+    # A fresh board has at most two dots per pair; more colored cells are
+    # drawn wires or something else on screen, and would only make the
+    # color pairing slow
+    colored = vision.colored_cells(grid)
+    if colored > 2 * vision.MAX_PAIRS:
+        log.warning("❌ Board not fresh: %d colored cells, a new puzzle has at most %d",
+                    colored, 2 * vision.MAX_PAIRS)
+        update_overlay_status("Board not fresh")
+        return
 
-    print("Matching wire pairs...")
+    # One pass over the sampled grid: empty cells, dot pairs and their colors
+    log.info("Matching wire pairs...")
     update_overlay_status("Matching...")
-    matched_pairs = vision.match(processed_image, grid_size=puzzle_size)
-    print(f"Found {len(matched_pairs)} wire pairs: {matched_pairs}")
-
-    print("Solving puzzle...")
+    labels, palette, matched_pairs, ambiguity = vision.classify(grid, grid_size=puzzle_size)
+    log.info("Found %d wire pairs: %s", len(matched_pairs), matched_pairs)
+    # Paths already solved while checking an ambiguous pairing
+    known = None
+    if max(ambiguity, default=0) > vision.AMBIGUITY_THRESHOLD:
+        # Similar colors: make sure the best pairing solves before drawing
+        # it, and fall back to the runner-up without recapturing
+        known = solver.solve(matched_pairs, grid_size=puzzle_size, engine=args.engine, fill=args.fill,
+                             cache=solution_cache, table=solution_table)
+        runner_up = None if all(known) else vision.classify(grid, grid_size=puzzle_size, rank=1)
+        if runner_up is not None:
+            trial = solver.solve(runner_up[2], grid_size=puzzle_size, engine=args.engine, fill=args.fill,
+                                 cache=solution_cache, table=solution_table)
+            if all(trial):
+                labels, palette, matched_pairs, ambiguity = runner_up
+                known = trial
+                log.info("🔀 Best color pairing has no solution, using the runner-up: %s", matched_pairs)
+            else:
+                log.warning("❌ Neither the best nor the runner-up color pairing has a solution")
+    processed_image = vision.paint(labels, grid)
+    if args.debug:
+        background.submit(save_debug_image, processed_image, "processed.png")
+    token.check()
+
+    log.info("Solving puzzle...")
     update_overlay_status("Solving...")
-    solutions = solver.solve(matched_pairs, grid_size=puzzle_size)
-    print("Solution paths:")
-    for i, path in enumerate(solutions):
-        if path:
-            print(f"  Pair {i+1}: {path}")
-        else:
-            print(f"  Pair {i+1}: No solution found")
-
-    print("Creating visualization...")
-    update_overlay_status("Visualizing...")
-    visualization = vision.visualize_path(solutions, processed=processed_image, grid_size=puzzle_size)
-    visualization.save("output.png")
-    print("Saved solution visualization to output.png")
 
-    # Display solution in overlay
-    draw_solution_in_overlay(solutions, processed_image, grid_size=puzzle_size)
+    def show_solution(solutions):
+        # The overlay draws on the Tk thread and the visualization on the
+        # background thread, neither holds up automation
+        draw_solution_in_overlay(solutions, processed_image, grid_size=puzzle_size)
+        if args.debug:
+            background.submit(save_visualization, solutions, processed_image)
 
     if auto_mode:
         update_overlay_status("Executing...")
-        print("Executing solution...")
-        automation.complete_solve(solutions, config, grid_size=puzzle_size)
-        print("✅ Done! Press Left Alt again to solve another puzzle.\n")
+        log.info("Executing solution...")
+        token.check()
+
+        # Draw each wire as soon as the solver fixes it, planning the order
+        # and start endpoints of whatever is ready together
+        solutions = [[] for _ in matched_pairs]
+
+        def stream():
+            remaining = len(solutions)
+            if known is None:
+                source = solver.iter_solve(matched_pairs, grid_size=puzzle_size, engine=args.engine,
+                                           fill=args.fill, cache=solution_cache, table=solution_table,
+                                           order=planner.StreamPlanner())
+            else:
+                source = planner.StreamPlanner()(list(enumerate(known)))
+            for i, path in source:
+                solutions[i] = path
+                remaining -= 1
+                if remaining == 0:
+                    show_solution(solutions)
+                yield i, path
+
+        def report_first_mouse_down():
+            latency = (time.perf_counter() - token.requested_at) * 1000
+            log.info("⏱️  First mouse-down %.0f ms after request", latency)
+
+        drawn = automation.complete_solve(stream(), config, grid_size=puzzle_size,
+                                          cancelled=lambda: token.cancelled,
+                                          on_first_mouse_down=report_first_mouse_down,
+                                          backend=input_backend, max_span=args.max_span or None)
+        if drawn and args.retries:
+            update_overlay_status("Verifying...")
+            automation.verify_solve(solutions, processed_image, screen.grab, config,
+                                    grid_size=puzzle_size, backend=input_backend,
+                                    retries=args.retries, max_span=args.max_span or None,
+                                    cancelled=lambda: token.cancelled, sample=sample_grid)
+        log_solution(solutions)
+        token.check()
+        log.info("✅ Done! Press Left Alt again to solve another puzzle.\n")
         update_overlay_status("Ready")
     else:
+        solutions = known
+        if solutions is None:
+            solutions = solver.solve(matched_pairs, grid_size=puzzle_size, engine=args.engine,
+                                     fill=args.fill, cache=solution_cache, table=solution_table)
+        token.check()
+        show_solution(solutions)
+        log_solution(solutions)
         update_overlay_status("Solved")
-        print("✅ Solution displayed! Press Left Alt again to solve another puzzle.\n")
+        log.info("✅ Solution displayed! Press Left Alt again to solve another puzzle.\n")
+
+def log_solution(solutions):
+    """Log the solution paths (verbose only)."""
+    if not log.isEnabledFor(logging.DEBUG):
+        return
+    log.debug("Solution paths:")
+    for i, path in enumerate(solutions):
+        if path:
+            log.debug("  Pair %d: %s", i + 1, path)
+        else:
+            log.debug("  Pair %d: No solution found", i + 1)
+
+def save_debug_image(image, filename):
+    """Save a capture or processed grid for debugging (runs on the background thread)."""
+    vision.to_image(image).save(filename)
+    log.info("Saved %s", filename)
+
+def save_visualization(solutions, processed_image):
+    """Render and save output.png (runs on the background thread)."""
+    visualization = vision.visualize_path(solutions, processed=processed_image, grid_size=puzzle_size)
+    visualization.save("output.png")
+    log.info("Saved solution visualization to output.png")
 
 # Track pressed keys for hotkey combination
 pressed_keys = set()
@@ -327,9 +573,9 @@ def on_key_press(key):
 
     # Check for Left Alt key - always work, but behavior depends on auto mode
     if key == Key.alt_l:
-        # Schedule execute_solve to run on main thread
-        if overlay:
-            overlay.after(0, execute_solve)
+        # Run execute_solve on the worker, superseding any solve in flight
+        if solve_pipeline:
+            solve_pipeline.request()
 
 def on_key_release(key):
     """Handle key release events."""
@@ -338,38 +584,124 @@ def on_key_release(key):
     except KeyError:
         pass
 
+def run_watcher(interval):
+    """
+    Sample the region in the background and solve each new puzzle once.
+
+    A frame is only analyzed after two samples with the same signature, so
+    opening animations are skipped, and a board is not solved again until
+    the puzzle disappears. With -c auto, samples that fail the region check
+    look for the puzzle elsewhere on screen instead, as does every sample
+    until the puzzle is first found.
+    """
+    last_signature = None
+    stable_samples = 0
+    last_board = None
+
+    while True:
+        time.sleep(interval)
+        if screen is None:
+            follow_region()
+            continue
+        frame = screen.latest()
+
+        if region_locator is not None and not region_locator.check(frame):
+            # Puzzle closed or moved: look for it elsewhere, less often the
+            # longer it stays away
+            last_board = None
+            follow_region()
+            continue
+
+        signature = vision.frame_signature(frame)
+        if signature != last_signature:
+            last_signature = signature
+            stable_samples = 0
+            continue
+        stable_samples += 1
+        if stable_samples != 1:
+            continue
+
+        processed = vision.clean_black(sample_grid(frame))
+        if not processed.any():
+            # Puzzle closed, the next one may repeat the same layout
+            last_board = None
+            continue
+
+        if not vision.is_fresh_puzzle(processed):
+            continue
+
+        board = processed.any(axis=2).tobytes()
+        if board != last_board and solve_pipeline:
+            last_board = board
+            log.info("👀 New puzzle detected")
+            solve_pipeline.request()
+
 def run_keyboard_listener():
     """Run keyboard listener in background thread."""
     with keyboard.Listener(on_press=on_key_press, on_release=on_key_release) as listener:
         try:
             listener.join()
         except KeyboardInterrupt:
-            print("\nExiting...")
+            log.info("\nExiting...")
 
 def main():
     """Main function that runs overlay on main thread."""
-    global root, overlay, canvas, status_text, auto_mode
+    global root, overlay, canvas, status_text, auto_mode, solve_pipeline, ui, input_backend
+
+    if args.calibrate:
+        try:
+            calibrate.calibrate(config, screen.grab, grid_size=puzzle_size, backend_name=args.input,
+                                sample=sample_grid)
+        except calibrate.CalibrationError as e:
+            log.error("❌ Calibration failed: %s", e)
+        finally:
+            screen.close()
+        return
 
     # Set auto mode from command line arguments
     auto_mode = args.auto
+    if auto_mode:
+        input_backend = automation.get_backend(args.input, args.event_delay, args.settle)
+        log.info("🖱️  Input backend: %s (delay %.1f ms, settle %.1f ms)", input_backend.name,
+                 input_backend.delay * 1000, input_backend.settle * 1000)
 
     # Create overlay on main thread
     create_overlay()
 
+    # Solves run on a worker thread and post UI updates back to Tk
+    ui = pipeline.UiQueue(overlay)
+    solve_pipeline = pipeline.SolvePipeline(execute_solve)
+
+    if args.prearm:
+        if screen is not None:
+            screen.start(fps=args.prearm)
+        log.info("📷 Pre-armed capture running at %d FPS", args.prearm)
+
+    if args.watch:
+        watch_thread = threading.Thread(target=run_watcher, args=(args.watch_interval,), daemon=True)
+        watch_thread.start()
+        log.info("👀 Watch mode: sampling every %ss", args.watch_interval)
+
     # Always start keyboard listener since Alt hotkey works in both modes
     keyboard_thread = threading.Thread(target=run_keyboard_listener, daemon=True)
     keyboard_thread.start()
 
     if auto_mode:
-        print("🎮 System ready! Press Left Alt to solve and execute puzzles.")
+        log.info("🎮 System ready! Press Left Alt to solve and execute puzzles.")
     else:
-        print("🎮 System ready! Press Left Alt to solve and display puzzles (no automation).")
+        log.info("🎮 System ready! Press Left Alt to solve and display puzzles (no automation).")
 
     # Run root window mainloop on main thread (this will block until window is closed)
     try:
         root.mainloop()
     except KeyboardInterrupt:
-        print("\nExiting...")
+        log.info("\nExiting...")
+    finally:
+        background.shutdown(wait=True)
+        if screen is not None:
+            screen.close()
+        if solution_cache is not None:
+            solution_cache.close()
 
 # Run the main function
 if __name__ == "__main__":
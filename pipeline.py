@@ -0,0 +1,122 @@
+"""
+Background solve pipeline.
+
+Runs the capture → vision → solve → automation job on a worker thread so
+the Tk overlay stays responsive. Requests coalesce: while a job runs, any
+number of new requests leave exactly one follow-up job pending, and each
+new request cancels the running job at its next checkpoint so a stale
+solution is never drawn.
+"""
+
+import logging
+import queue
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+class Cancelled(Exception):
+    """Raised by JobToken.check() when a newer request superseded the job."""
+
+class JobToken:
+    """Handed to each job; lets it notice that it has been superseded."""
+
+    def __init__(self, pipeline, generation, requested_at):
+        self._pipeline = pipeline
+        self.generation = generation
+        # perf_counter() time of the request that started this job
+        self.requested_at = requested_at
+
+    @property
+    def cancelled(self):
+        return self._pipeline.generation != self.generation
+
+    def check(self):
+        """Raise Cancelled if a newer request has arrived."""
+        if self.cancelled:
+            raise Cancelled()
+
+class SolvePipeline:
+    """
+    Single worker thread running job(token) once per (coalesced) request.
+
+    Args:
+        job: Callable taking a JobToken; should call token.check() between
+            stages and stop when token.cancelled becomes true
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.generation = 0
+        self.requested_at = 0.0
+        # True from just before a job starts until it returns
+        self.busy = False
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def request(self):
+        """Ask for a fresh run, cancelling the one in flight."""
+        with self._lock:
+            self.generation += 1
+            self.requested_at = time.perf_counter()
+        self._wake.set()
+
+    def cancel(self):
+        """Cancel the job in flight without starting a new one."""
+        with self._lock:
+            self.generation += 1
+
+    def _run(self):
+        handled = 0
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+
+            with self._lock:
+                generation = self.generation
+                requested_at = self.requested_at
+            if generation == handled:
+                # Only a cancel() since the last run
+                continue
+            handled = generation
+
+            self.busy = True
+            try:
+                self.job(JobToken(self, generation, requested_at))
+            except Cancelled:
+                log.info("⏭️  Solve superseded by a newer request")
+            except Exception:
+                log.exception("Solve failed")
+            finally:
+                self.busy = False
+
+class UiQueue:
+    """
+    Thread-safe way to run callbacks on the Tk main thread.
+
+    Worker threads call post(); the Tk thread drains the queue every
+    interval_ms via widget.after().
+    """
+
+    def __init__(self, widget, interval_ms=15):
+        self._queue = queue.Queue()
+        self._widget = widget
+        self._interval_ms = interval_ms
+        self._widget.after(interval_ms, self._drain)
+
+    def post(self, func, *args, **kwargs):
+        self._queue.put((func, args, kwargs))
+
+    def _drain(self):
+        try:
+            while True:
+                func, args, kwargs = self._queue.get_nowait()
+                try:
+                    func(*args, **kwargs)
+                except Exception:
+                    log.exception("UI callback failed")
+        except queue.Empty:
+            pass
+        self._widget.after(self._interval_ms, self._drain)
@@ -0,0 +1,208 @@
+"""
+Wire drawing planner.
+
+Sits between the solver and automation.complete_solve(): picks the order
+the wires are drawn in and which endpoint each one starts from, so the
+cursor travels as little as possible between wires, and merges straight
+runs of a wire into fewer drag steps.
+
+Distances are in grid cells; the screen mapping is a uniform scale, so the
+best plan in cells is the best plan on screen.
+"""
+
+import itertools
+import math
+
+# Up to this many wires the order is solved exactly, beyond it greedily
+EXACT_LIMIT = 6
+
+def _distance(a, b):
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+def travel(plan, start=None):
+    """
+    Total cursor travel between wires of a plan.
+
+    Args:
+        plan: List of (index, path) in drawing order
+        start: Cursor cell before the first wire, or None to not count the
+            move to the first wire
+    """
+    total = 0.0
+    cursor = start
+    for _, path in plan:
+        if cursor is not None:
+            total += _distance(cursor, path[0])
+        cursor = path[-1]
+    return total
+
+def _endpoints(wires):
+    """(first cell, last cell) of every wire in both directions: ends[i][d]."""
+    return [[(w[0], w[-1]), (w[-1], w[0])] for w in wires]
+
+def _plan_exact(wires, start):
+    """Held-Karp over (drawn set, last wire, direction); exact for small counts."""
+    n = len(wires)
+    ends = _endpoints(wires)
+    # hop[i][d][j][e]: travel from the end of wire i in direction d to the start of j in direction e
+    hop = [[[[_distance(ends[i][d][1], ends[j][e][0]) for e in range(2)] for j in range(n)]
+            for d in range(2)] for i in range(n)]
+
+    # best[mask][i * 2 + d] = (cost, previous state)
+    best = [[None] * (2 * n) for _ in range(1 << n)]
+    for i in range(n):
+        for d in range(2):
+            cost = _distance(start, ends[i][d][0]) if start is not None else 0.0
+            best[1 << i][i * 2 + d] = (cost, None)
+
+    for mask in range(1, 1 << n):
+        states = best[mask]
+        for i in range(n):
+            if not (mask >> i) & 1:
+                continue
+            for d in range(2):
+                state = states[i * 2 + d]
+                if state is None:
+                    continue
+                cost = state[0]
+                row = hop[i][d]
+                for j in range(n):
+                    if (mask >> j) & 1:
+                        continue
+                    following = best[mask | (1 << j)]
+                    for e in range(2):
+                        candidate = cost + row[j][e]
+                        current = following[j * 2 + e]
+                        if current is None or candidate < current[0]:
+                            following[j * 2 + e] = (candidate, (mask, i, d))
+
+    full = (1 << n) - 1
+    i, d = min(((i, d) for i in range(n) for d in range(2)), key=lambda k: best[full][k[0] * 2 + k[1]][0])
+    key = (full, i, d)
+    order = []
+    while key is not None:
+        mask, i, d = key
+        order.append((i, d))
+        key = best[mask][i * 2 + d][1]
+    order.reverse()
+    return order
+
+def _plan_greedy(wires, start):
+    """Nearest endpoint first, then 2-opt and or-opt moves until none helps."""
+    ends = _endpoints(wires)
+    remaining = set(range(len(wires)))
+    cursor = start
+    order = []
+    while remaining:
+        if cursor is None:
+            i, d = min(remaining), 0
+        else:
+            i, d = min(((i, d) for i in remaining for d in range(2)),
+                       key=lambda c: _distance(cursor, ends[c[0]][c[1]][0]))
+        order.append((i, d))
+        remaining.discard(i)
+        cursor = ends[i][d][1]
+
+    def cost(order):
+        total = 0.0
+        cursor = start
+        for i, d in order:
+            first, last = ends[i][d]
+            if cursor is not None:
+                total += _distance(cursor, first)
+            cursor = last
+        return total
+
+    def neighbors(order):
+        # 2-opt: reversing a run of wires also flips the direction of each one
+        for a, b in itertools.combinations(range(len(order) + 1), 2):
+            yield order[:a] + [(i, 1 - d) for i, d in reversed(order[a:b])] + order[b:]
+        # Or-opt: move one wire elsewhere, in either direction
+        for a in range(len(order)):
+            rest = order[:a] + order[a + 1:]
+            i, d = order[a]
+            for b in range(len(order)):
+                if b != a:
+                    yield rest[:b] + [(i, d)] + rest[b:]
+                    yield rest[:b] + [(i, 1 - d)] + rest[b:]
+
+    best = cost(order)
+    improved = True
+    while improved:
+        improved = False
+        for candidate in neighbors(order):
+            candidate_cost = cost(candidate)
+            if candidate_cost < best - 1e-9:
+                order, best = candidate, candidate_cost
+                improved = True
+                break
+    return order
+
+def plan(paths, start=None):
+    """
+    Order wires and choose their starting endpoints for the least travel.
+
+    Args:
+        paths: Solver output, one list of (x,y) turning points per pair
+        start: Cursor cell before drawing, or None if unknown
+
+    Returns:
+        List of (index, path) in drawing order, each path oriented to start
+        from the chosen endpoint; empty paths are dropped
+    """
+    indices = [i for i, path in enumerate(paths) if path and len(path) >= 2]
+    wires = [[tuple(cell) for cell in paths[i]] for i in indices]
+    if not wires:
+        return []
+
+    if len(wires) <= EXACT_LIMIT:
+        order = _plan_exact(wires, start)
+    else:
+        order = _plan_greedy(wires, start)
+    return [(indices[i], wires[i][::-1] if d else wires[i]) for i, d in order]
+
+class StreamPlanner:
+    """
+    Plans wires that arrive in batches, e.g. as the order= callable of
+    solver.iter_solve(). Each batch is planned with plan() from where the
+    previous batch left the cursor.
+
+    Args:
+        start: Cursor cell before drawing, or None if unknown
+    """
+
+    def __init__(self, start=None):
+        self.cursor = start
+
+    def __call__(self, batch):
+        planned = [(batch[j][0], path) for j, path in plan([path for _, path in batch], self.cursor)]
+        if planned:
+            self.cursor = planned[-1][1][-1]
+        # Wires with nothing to draw pass through for the caller to skip
+        drawn = {i for i, _ in planned}
+        return planned + [(i, path) for i, path in batch if i not in drawn]
+
+def merge_collinear(cells, max_span=None):
+    """
+    Drop the middle cells of straight runs.
+
+    Args:
+        cells: Every cell of a wire, as from automation.expand_path()
+        max_span: Most cells one step may cover (None for no limit; 1
+            keeps every cell)
+
+    Returns:
+        The cells a drag has to visit
+    """
+    if len(cells) <= 2 or max_span == 1:
+        return list(cells)
+
+    merged = [cells[0]]
+    for prev, cell, nxt in zip(cells, cells[1:], cells[2:]):
+        turning = (cell[0] - prev[0], cell[1] - prev[1]) != (nxt[0] - cell[0], nxt[1] - cell[1])
+        last = merged[-1]
+        span = abs(cell[0] - last[0]) + abs(cell[1] - last[1])
+        if turning or (max_span is not None and span >= max_span):
+            merged.append(cell)
+    merged.append(cells[-1])
+    return merged
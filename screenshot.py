@@ -47,11 +47,21 @@ def main():
     parser = argparse.ArgumentParser(description='Take a screenshot of the entire screen')
     parser.add_argument('-o', '--output',
                         help='Output filename (default: screenshot_TIMESTAMP.png)')
+    parser.add_argument('-l', '--locate', action='store_true',
+                        help='Find the puzzle grid in the screenshot and print its -c config')
 
     args = parser.parse_args()
 
     # Take screenshot
-    take_screenshot(args.output)
+    screenshot = take_screenshot(args.output)
+
+    if args.locate:
+        import locator
+        region = locator.locate(screenshot)
+        if region is None:
+            print("No puzzle grid found in the screenshot")
+        else:
+            print(f"Puzzle config: -c \"i{region[0]}|{region[1]}|{region[2]}\"")
 
 if __name__ == "__main__":
     main()
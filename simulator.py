@@ -3,6 +3,45 @@ from tkinter import Canvas, Button, Frame, Text, Scrollbar
 import random
 import json
 
+import logs
+
+def random_pairs(grid_size=6, rng=random):
+    """
+    Place 4-6 random wire pairs on empty cells, the way the generator does.
+
+    Args:
+        grid_size: Size of the square grid (default 6 for 6x6)
+        rng: random.Random instance (default: the random module)
+
+    Returns:
+        List of coordinate pairs [[(x1,y1), (x2,y2)], ...], or None if a
+        pair could not be placed. The layout is not checked for solvability.
+    """
+    pairs = []
+    used_positions = set()
+
+    # Generate 4-6 random wire pairs
+    num_pairs = rng.randint(4, 6)
+
+    for i in range(num_pairs):
+        # Find two random empty positions
+        pair_attempts = 0
+        while pair_attempts < 50:  # Prevent infinite loop
+            x1, y1 = rng.randint(0, grid_size - 1), rng.randint(0, grid_size - 1)
+            x2, y2 = rng.randint(0, grid_size - 1), rng.randint(0, grid_size - 1)
+
+            if (x1, y1) not in used_positions and (x2, y2) not in used_positions and (x1, y1) != (x2, y2):
+                used_positions.add((x1, y1))
+                used_positions.add((x2, y2))
+                pairs.append([(x1, y1), (x2, y2)])
+                break
+            pair_attempts += 1
+
+        if pair_attempts >= 50:
+            return None
+
+    return pairs
+
 class GeneratorSimulator:
     def __init__(self):
         self.root = tk.Tk()
@@ -100,35 +139,12 @@ class GeneratorSimulator:
             attempt += 1
             print(f"Generation attempt {attempt}...")
 
-            temp_pairs = []
-            used_positions = set()
-
-            # Generate 4-6 random wire pairs
-            num_pairs = random.randint(4, 6)
-
-            # Generate all pairs for this attempt
-            success = True
-            for i in range(num_pairs):
-                # Find two random empty positions
-                pair_attempts = 0
-                while pair_attempts < 50:  # Prevent infinite loop
-                    x1, y1 = random.randint(0, 5), random.randint(0, 5)
-                    x2, y2 = random.randint(0, 5), random.randint(0, 5)
-
-                    if (x1, y1) not in used_positions and (x2, y2) not in used_positions and (x1, y1) != (x2, y2):
-                        used_positions.add((x1, y1))
-                        used_positions.add((x2, y2))
-                        temp_pairs.append([(x1, y1), (x2, y2)])
-                        break
-                    pair_attempts += 1
-
-                if pair_attempts >= 50:
-                    success = False
-                    break
+            temp_pairs = random_pairs(self.grid_size)
 
             # If we couldn't generate all pairs, try again
-            if not success or len(temp_pairs) != num_pairs:
+            if temp_pairs is None:
                 continue
+            num_pairs = len(temp_pairs)
 
             # Test if this puzzle is solvable
             print(f"Testing solvability of {num_pairs} pairs...")
@@ -412,5 +428,7 @@ class GeneratorSimulator:
         self.root.mainloop()
 
 if __name__ == "__main__":
+    # Show the solver's progress while checking solvability
+    logs.setup()
     simulator = GeneratorSimulator()
     simulator.run()
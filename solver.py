@@ -1,26 +1,147 @@
-try:
-    from z3 import Solver, Sum, Int, If, And, Or, sat
-    Z3_AVAILABLE = True
-except ImportError:
-    Z3_AVAILABLE = False
-    print("⚠️  Z3 solver not available. Install with: pip install z3-solver")
+import importlib.util
+import logging
+import queue
+import threading
 
-def solve(pairs, grid_size=6):
+log = logging.getLogger(__name__)
+
+# z3 is only imported when the z3 engine actually runs, so the bitboard
+# engine never pays for the import.
+Z3_AVAILABLE = importlib.util.find_spec("z3") is not None
+if not Z3_AVAILABLE:
+    log.warning("⚠️  Z3 solver not available. Install with: pip install z3-solver")
+
+ENGINES = ("z3", "bitboard")
+Z3_ENCODINGS = ("int", "bool")
+
+def solve(pairs, grid_size=6, engine="z3", encoding="int", fill=False, cache=None, table=None):
     """
     Solve Flow Free puzzle using Z3 constraint solver approach.
 
     Args:
         pairs: List of coordinate pairs [[(x1,y1), (x2,y2)], ...]
         grid_size: Size of the square grid (default 6 for 6x6)
+        engine: "z3" for the constraint solver or "bitboard" for the
+            pure-Python backtracking solver (default "z3")
+        encoding: z3 model encoding, "int" or "bool" (default "int")
+        fill: If True, every cell must be covered by a wire (default False)
+        cache: Optional cache.SolutionCache consulted before solving and
+            updated with complete solutions
+        table: Optional table.SolutionTable of precomputed solutions,
+            consulted first
 
     Returns:
         List of paths, where each path is a list of turning points from start to end
     """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown solver engine: {engine!r} (expected one of {ENGINES})")
+
+    known = _lookup(pairs, grid_size, fill, cache, table)
+    if known is not None:
+        return known
+
+    paths = _solve_uncached(pairs, grid_size, engine, encoding, fill)
+
+    if cache is not None:
+        cache.put(pairs, paths, grid_size, fill)
+    return paths
+
+def iter_solve(pairs, grid_size=6, engine="z3", encoding="int", fill=False, cache=None, table=None,
+               order=None):
+    """
+    Solve like solve(), yielding each pair's path as soon as it is fixed.
+
+    The search runs on a helper thread. Nothing is yielded until the puzzle
+    is known to be solvable; from then on, paths that were forced before any
+    branching (bitboard engine) or are traced from the solved board (z3) are
+    yielded while the rest of the work continues, so the caller can start
+    drawing the first wire early.
+
+    Args:
+        Same as solve(), plus
+        order: Optional callable given each batch of (index, path) that
+            became ready together and returning it in the order to yield,
+            such as a planner.StreamPlanner
+
+    Yields:
+        (index, path) exactly once per pair, in no particular order; every
+        path is [] when the puzzle has no solution
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown solver engine: {engine!r} (expected one of {ENGINES})")
+
+    if order is None:
+        order = list
+
+    known = _lookup(pairs, grid_size, fill, cache, table)
+    if known is not None:
+        yield from order(list(enumerate(known)))
+        return
+
+    results = queue.Queue()
+
+    def produce():
+        try:
+            paths = _solve_uncached(pairs, grid_size, engine, encoding, fill,
+                                    on_fixed=lambda i, path: results.put((i, path)))
+        except Exception as e:
+            results.put(e)
+        else:
+            results.put(paths)
+
+    worker = threading.Thread(target=produce, daemon=True)
+    worker.start()
+    try:
+        sent = set()
+        done = False
+        while not done:
+            # Batch everything that is ready, so order() can plan across it
+            batch = []
+            item = results.get()
+            while True:
+                if isinstance(item, Exception):
+                    raise item
+                if not isinstance(item, tuple):
+                    if cache is not None:
+                        cache.put(pairs, item, grid_size, fill)
+                    batch.extend((i, path) for i, path in enumerate(item) if i not in sent)
+                    done = True
+                    break
+                sent.add(item[0])
+                batch.append(item)
+                try:
+                    item = results.get_nowait()
+                except queue.Empty:
+                    break
+            yield from order(batch)
+    finally:
+        # Never leave a search running on the shared z3 templates
+        worker.join()
+
+def _lookup(pairs, grid_size, fill, cache, table):
+    """Precomputed or cached paths for pairs, or None."""
+    if table is not None:
+        precomputed = table.get(pairs, grid_size, fill)
+        if precomputed is not None:
+            log.info("⚡ Table hit for %d pairs", len(pairs))
+            return precomputed
+
+    if cache is not None:
+        cached = cache.get(pairs, grid_size, fill)
+        if cached is not None:
+            log.info("⚡ Cache hit for %d pairs", len(pairs))
+            return cached
+    return None
+
+def _solve_uncached(pairs, grid_size, engine, encoding, fill, on_fixed=None):
+    if engine == "bitboard":
+        return solve_with_bitboard(pairs, grid_size, fill=fill, on_fixed=on_fixed)
+
     if not Z3_AVAILABLE:
-        print("❌ Z3 solver not available, falling back to DFS solver")
-        return solve_with_dfs(pairs, grid_size)
+        log.warning("❌ Z3 solver not available, falling back to DFS solver")
+        return solve_with_dfs(pairs, grid_size, fill=fill, on_fixed=on_fixed)
 
-    print(f"🔍 Z3 constraint solving {len(pairs)} pairs...")
+    log.info("🔍 Z3 constraint solving %d pairs...", len(pairs))
 
     # Create board with pair endpoints
     board = [[0 for _ in range(grid_size)] for _ in range(grid_size)]
@@ -29,89 +150,273 @@ def solve(pairs, grid_size=6):
         board[y1][x1] = pair_id
         board[y2][x2] = pair_id
 
-    print("📋 Initial board:")
-    for row in board:
-        print("   ", row)
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("📋 Initial board:")
+        for row in board:
+            log.debug("    %s", row)
 
     # Solve using Z3 constraints
-    solved_board = solve_with_z3(board, grid_size, grid_size)
+    solved_board = solve_with_z3(board, grid_size, grid_size, encoding=encoding, fill=fill)
 
     if solved_board:
-        print("✅ Z3 solved the puzzle!")
-        print("📋 Solved board:")
-        for row in solved_board:
-            print("   ", row)
+        log.info("✅ Z3 solved the puzzle!")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("📋 Solved board:")
+            for row in solved_board:
+                log.debug("    %s", row)
 
         # Extract paths from solved board
-        paths = extract_paths_from_solution(solved_board, pairs, grid_size)
+        paths = extract_paths_from_solution(solved_board, pairs, grid_size, on_fixed=on_fixed)
         return paths
     else:
-        print("❌ Z3 could not find a solution")
+        log.info("❌ Z3 could not find a solution")
         return [[] for _ in pairs]
 
-def solve_with_z3(board, M, N):
+# Long-lived z3 models, keyed by (encoding, M, N, colors)
+_Z3_TEMPLATES = {}
+
+class _Z3Template:
+    """
+    Reusable z3 model skeleton for one grid size.
+
+    The cell variables and neighbor constraints are built once per (M, N).
+    Each solve only adds the endpoint assignments inside a push()/pop()
+    scope on the long-lived Solver.
+
+    Every colored cell other than its pair's root endpoint must have a
+    same-colored neighbor with a smaller distance D, so a closed loop of
+    path cells can never satisfy the model.
+    """
+
+    def __init__(self, M, N):
+        from z3 import Solver, Sum, Int, Bool, If, And, Or, Implies, Not
+
+        log.info("🔧 Building Z3 model template for %dx%d grid...", M, N)
+
+        # Create Z3 variables for each cell
+        self.B = [[Int(f'B_{i}_{j}') for j in range(N)] for i in range(M)]
+        # E_i_j is true when the cell holds a pair endpoint
+        self.E = [[Bool(f'E_{i}_{j}') for j in range(N)] for i in range(M)]
+        # R_i_j marks the endpoint each pair's distances count from
+        self.R = [[Bool(f'R_{i}_{j}') for j in range(N)] for i in range(M)]
+        # Distance from the pair's root endpoint along its path
+        self.D = [[Int(f'D_{i}_{j}') for j in range(N)] for i in range(M)]
+        # Number of pairs, bounds the color of every cell
+        self.K = Int('K')
+
+        s = Solver()
+        B, E, R, D, K = self.B, self.E, self.R, self.D, self.K
+
+        for i in range(M):
+            for j in range(N):
+                # Constraint 1: Each cell is empty (0) or gets assigned a valid color
+                s.add(B[i][j] >= 0, B[i][j] <= K)
+
+                # Constraint 2: Flow connectivity rules
+                neighbors = [(i + di, j + dj) for di, dj in [(-1, 0), (1, 0), (0, -1), (0, 1)]
+                             if 0 <= i + di < M and 0 <= j + dj < N]
+
+                same_neighs_ij = Sum([If(And(B[i][j] != 0, B[i][j] == B[k][l]), 1, 0)
+                                     for k, l in neighbors])
+
+                # Endpoint cells: exactly one neighbor with same color
+                s.add(Implies(E[i][j], same_neighs_ij == 1))
+                # Empty cells: remain empty or have exactly 2 neighbors (path cell)
+                s.add(Implies(Not(E[i][j]), Or(B[i][j] == 0, same_neighs_ij == 2)))
+
+                # Constraint 3: No cycles, every colored cell leads back to its root
+                s.add(Implies(R[i][j], D[i][j] == 0))
+                s.add(Implies(And(Not(R[i][j]), B[i][j] != 0),
+                              Or([And(B[k][l] == B[i][j], D[k][l] < D[i][j]) for k, l in neighbors])))
+
+        self.solver = s
+
+    def solve(self, board, fill=False):
+        """
+        Solve for the endpoints in board. Returns the solved board or None.
+        """
+        from z3 import Not, sat
+
+        s = self.solver
+        B, E, R = self.B, self.E, self.R
+        M, N = len(B), len(B[0])
+        roots = _root_cells(board)
+
+        s.push()
+        try:
+            s.add(self.K == len([cell for row in board for cell in row if cell != 0]) // 2)
+            for i in range(M):
+                for j in range(N):
+                    if board[i][j] != 0:
+                        s.add(E[i][j], B[i][j] == board[i][j])
+                    else:
+                        s.add(Not(E[i][j]))
+                    s.add(R[i][j] if (i, j) in roots else Not(R[i][j]))
+                    if fill:
+                        s.add(B[i][j] != 0)
+
+            log.debug("🔧 Solving with Z3...")
+
+            # Solve the constraints
+            result = s.check()
+            log.debug("🔍 Z3 result: %s", result)
+
+            if result != sat:
+                return None
+
+            m = s.model()
+            return [[m.eval(B[i][j], model_completion=True).as_long() for j in range(N)]
+                    for i in range(M)]
+        finally:
+            s.pop()
+
+class _Z3BoolTemplate:
+    """
+    One-hot Boolean version of _Z3Template for a fixed number of colors.
+
+    X_i_j_c is true when cell (i, j) has color c; an empty cell has no color
+    set. The same-color neighbor counts are pseudo-Boolean constraints, so
+    the whole model runs on z3's SAT backend (QF_FD) instead of If-sums
+    over unbounded Ints. Cycles are ruled out with the same root distance
+    constraint as _Z3Template, using small bit-vectors for D.
+    """
+
+    def __init__(self, M, N, colors):
+        from z3 import SolverFor, Bool, BitVec, And, Or, Not, Implies, AtMost, PbEq, ULT
+
+        log.info("🔧 Building Z3 Boolean model template for %dx%d grid, %d colors...", M, N, colors)
+
+        self.X = [[[Bool(f'X_{i}_{j}_{c}') for c in range(1, colors + 1)] for j in range(N)]
+                  for i in range(M)]
+        self.E = [[Bool(f'E_{i}_{j}') for j in range(N)] for i in range(M)]
+        self.R = [[Bool(f'R_{i}_{j}') for j in range(N)] for i in range(M)]
+        bits = max(1, (M * N).bit_length())
+        self.D = [[BitVec(f'D_{i}_{j}', bits) for j in range(N)] for i in range(M)]
+
+        s = SolverFor("QF_FD")
+        X, E, R, D = self.X, self.E, self.R, self.D
+
+        for i in range(M):
+            for j in range(N):
+                # Each cell has at most one color
+                s.add(AtMost(*X[i][j], 1))
+
+                neighbors = [(i + di, j + dj) for di, dj in [(-1, 0), (1, 0), (0, -1), (0, 1)]
+                             if 0 <= i + di < M and 0 <= j + dj < N]
+
+                for c in range(colors):
+                    same = [(X[k][l][c], 1) for k, l in neighbors]
+                    # Endpoints have one same-colored neighbor, path cells two
+                    s.add(Implies(And(E[i][j], X[i][j][c]), PbEq(same, 1)))
+                    s.add(Implies(And(Not(E[i][j]), X[i][j][c]), PbEq(same, 2)))
+                    # No cycles, every colored cell leads back to its root
+                    s.add(Implies(And(Not(R[i][j]), X[i][j][c]),
+                                  Or([And(X[k][l][c], ULT(D[k][l], D[i][j])) for k, l in neighbors])))
+
+        self.solver = s
+
+    def solve(self, board, fill=False):
+        """
+        Solve for the endpoints in board. Returns the solved board or None.
+        """
+        from z3 import Not, Or, is_true, sat
+
+        s = self.solver
+        X, E, R = self.X, self.E, self.R
+        M, N = len(X), len(X[0])
+        roots = _root_cells(board)
+
+        s.push()
+        try:
+            for i in range(M):
+                for j in range(N):
+                    if board[i][j] != 0:
+                        s.add(E[i][j], X[i][j][board[i][j] - 1])
+                    else:
+                        s.add(Not(E[i][j]))
+                    s.add(R[i][j] if (i, j) in roots else Not(R[i][j]))
+                    if fill:
+                        s.add(Or(X[i][j]))
+
+            log.debug("🔧 Solving with Z3...")
+
+            result = s.check()
+            log.debug("🔍 Z3 result: %s", result)
+
+            if result != sat:
+                return None
+
+            m = s.model()
+            solution = [[0 for _ in range(N)] for _ in range(M)]
+            for i in range(M):
+                for j in range(N):
+                    for c, x in enumerate(X[i][j]):
+                        if is_true(m.eval(x, model_completion=True)):
+                            solution[i][j] = c + 1
+                            break
+            return solution
+        finally:
+            s.pop()
+
+def _root_cells(board):
+    """First endpoint of each pair in row-major order, as a set of (i, j)."""
+    roots = {}
+    for i, row in enumerate(board):
+        for j, cell in enumerate(row):
+            if cell != 0 and cell not in roots:
+                roots[cell] = (i, j)
+    return set(roots.values())
+
+def _z3_template(M, N, encoding="int", colors=0):
+    if encoding == "int":
+        key = (encoding, M, N, None)
+    else:
+        key = (encoding, M, N, colors)
+
+    template = _Z3_TEMPLATES.get(key)
+    if template is None:
+        if encoding == "int":
+            template = _Z3Template(M, N)
+        else:
+            template = _Z3BoolTemplate(M, N, colors)
+        _Z3_TEMPLATES[key] = template
+    return template
+
+def solve_with_z3(board, M, N, encoding="int", fill=False):
     """
     Use Z3 constraint solver to solve the Flow Free puzzle.
     Based on the algorithm from FlowFree.py
+
+    The model for each grid size is built on first use and reused for
+    every later solve in the session.
+
+    Args:
+        board: MxN list of lists, pair number at endpoints and 0 elsewhere
+        M, N: Board dimensions
+        encoding: "int" for Int cell colors with If-sums, or "bool" for a
+            one-hot Boolean encoding with pseudo-Boolean neighbor counts
+        fill: If True, every cell must be covered by a path
+
+    Returns:
+        Solved MxN board, or None if there is no solution
     """
-    print("🔧 Setting up Z3 constraints...")
-
-    # Create Z3 variables for each cell
-    B = [[Int(f'B_{i}_{j}') for j in range(N)] for i in range(M)]
-
-    s = Solver()
-
-    # Constraint 1: Each cell either keeps its original value or gets assigned a valid color
-    # Fixed: Allow cells to be 0 (empty) as well
-    s.add([If(board[i][j] != 0,
-              B[i][j] == board[i][j],
-              And(B[i][j] >= 0, B[i][j] <= len([cell for row in board for cell in row if cell != 0]) // 2))
-           for j in range(N) for i in range(M)])
-
-    print(f"🎯 Added basic constraints for {M}x{N} grid")
-
-    # Constraint 2: Flow connectivity rules
-    for i in range(M):
-        for j in range(N):
-            # Count neighbors with same color (Manhattan distance = 1)
-            neighbors = []
-            for k in range(M):
-                for l in range(N):
-                    if abs(k - i) + abs(l - j) == 1:  # Adjacent cells only
-                        neighbors.append((k, l))
-
-            same_neighs_ij = Sum([If(And(B[i][j] != 0, B[i][j] == B[k][l]), 1, 0)
-                                 for k, l in neighbors])
-
-            if board[i][j] != 0:  # Endpoint cells
-                s.add(same_neighs_ij == 1)  # Exactly one neighbor with same color
-            else:  # Empty cells
-                s.add(Or(
-                    B[i][j] == 0,  # Cell remains empty
-                    same_neighs_ij == 2  # Or has exactly 2 neighbors (path cell)
-                ))
-
-    print("🔧 Solving with Z3...")
-
-    # Solve the constraints
-    result = s.check()
-    print(f"🔍 Z3 result: {result}")
-
-    if result == sat:
-        print("✅ Z3 found a solution!")
-        m = s.model()
-        solution = [[m[B[i][j]].as_long() for j in range(N)] for i in range(M)]
-        return solution
+    if encoding not in Z3_ENCODINGS:
+        raise ValueError(f"Unknown z3 encoding: {encoding!r} (expected one of {Z3_ENCODINGS})")
+
+    colors = max((cell for row in board for cell in row), default=0)
+    solution = _z3_template(M, N, encoding, colors).solve(board, fill=fill)
+
+    if solution is not None:
+        log.debug("✅ Z3 found a solution!")
     else:
-        print("❌ Z3 says no solution exists")
-        # Debug: show why it's unsat
-        if hasattr(s, 'unsat_core'):
-            print("🔍 Unsat core:", s.unsat_core())
-        return None
+        log.debug("❌ Z3 says no solution exists")
+    return solution
 
-def extract_paths_from_solution(solved_board, pairs, grid_size):
+def extract_paths_from_solution(solved_board, pairs, grid_size, on_fixed=None):
     """
     Extract paths from the Z3 solution by tracing connected components.
+
+    on_fixed, if given, is called with (index, path) as each path is traced.
     """
     paths = []
 
@@ -126,6 +431,8 @@ def extract_paths_from_solution(solved_board, pairs, grid_size):
             paths.append(simplified)
         else:
             paths.append([])
+        if on_fixed is not None:
+            on_fixed(i, paths[-1])
 
     return paths
 
@@ -161,14 +468,336 @@ def find_path_in_solution(board, start, end, target_value, grid_size):
 
     return dfs(start_x, start_y, [])
 
-def solve_with_dfs(pairs, grid_size):
+def solve_with_dfs(pairs, grid_size, fill=False, on_fixed=None):
     """
     Fallback DFS solver when Z3 is not available.
     """
-    # Simple DFS implementation as fallback
-    print("🔄 Using DFS fallback solver...")
-    # This would be a simpler implementation
-    return [[] for _ in pairs]
+    log.info("🔄 Using DFS fallback solver...")
+    return solve_with_bitboard(pairs, grid_size, fill=fill, on_fixed=on_fixed)
+
+def solve_with_bitboard(pairs, grid_size, fill=False, on_fixed=None):
+    """
+    Solve the puzzle with the pure-Python bitboard backtracking engine.
+
+    Args:
+        pairs: List of coordinate pairs [[(x1,y1), (x2,y2)], ...]
+        grid_size: Size of the square grid
+        fill: If True, every cell of the grid must be covered by a path
+        on_fixed: Optional callable given (index, path) for every pair whose
+            path is forced before the search branches, since such a path is
+            the same in every solution; called once the search has found a
+            solution, so nothing is reported for an unsolvable puzzle
+
+    Returns:
+        List of paths in the same format as solve()
+    """
+    log.info("🔍 Bitboard solving %d pairs...", len(pairs))
+
+    search = _BitboardSearch(pairs, grid_size, fill)
+    # Forced paths only hold if the rest of the board can be completed, so
+    # keep them back until the search says it can
+    forced = search.propagate() if on_fixed is not None else []
+    cell_paths = search.run()
+
+    if cell_paths is None:
+        log.info("❌ Bitboard search could not find a solution")
+        return [[] for _ in pairs]
+
+    log.info("✅ Bitboard solved the puzzle!")
+    for i, path in forced:
+        on_fixed(i, simplify_path(path))
+    return [simplify_path(path) for path in cell_paths]
+
+# Per grid size: (neighbor lists, neighbor masks, full mask, not-first-column mask, not-last-column mask)
+_BITBOARD_TABLES = {}
+
+def _bitboard_tables(grid_size):
+    """
+    Precompute the neighbor and shift masks used by the bitboard engine.
+    Cell (x, y) is bit y * grid_size + x.
+    """
+    tables = _BITBOARD_TABLES.get(grid_size)
+    if tables is None:
+        cells = grid_size * grid_size
+        neighbors = []
+        neighbor_masks = []
+        for i in range(cells):
+            x, y = i % grid_size, i // grid_size
+            adjacent = tuple(ny * grid_size + nx
+                             for nx, ny in [(x, y - 1), (x + 1, y), (x, y + 1), (x - 1, y)]
+                             if 0 <= nx < grid_size and 0 <= ny < grid_size)
+            neighbors.append(adjacent)
+            neighbor_masks.append(sum(1 << c for c in adjacent))
+        full = (1 << cells) - 1
+        not_first_col = sum(1 << i for i in range(cells) if i % grid_size != 0)
+        not_last_col = sum(1 << i for i in range(cells) if i % grid_size != grid_size - 1)
+        tables = (neighbors, neighbor_masks, full, not_first_col, not_last_col)
+        _BITBOARD_TABLES[grid_size] = tables
+    return tables
+
+class _BitboardSearch:
+    """
+    Backtracking search state for solve_with_bitboard().
+
+    Every pair grows one path from its head endpoint towards its target.
+    A path cell may only touch its own path at the previous cell, which is
+    the same "exactly two same-colored neighbors" rule the z3 model uses.
+    """
+
+    def __init__(self, pairs, grid_size, fill=False):
+        (self.neighbors, self.neighbor_masks, self.full,
+         self.not_first_col, self.not_last_col) = _bitboard_tables(grid_size)
+        self.grid_size = grid_size
+        self.fill = fill
+        self.valid = True
+        self.heads = []
+        self.targets = []
+        self.paths = []
+        self.path_masks = []
+        self.flipped = []
+        self.occupied = 0
+        self.failed = set()
+
+        for (x1, y1), (x2, y2) in pairs:
+            start = y1 * grid_size + x1
+            end = y2 * grid_size + x2
+            if start == end or (self.occupied >> start) & 1 or (self.occupied >> end) & 1:
+                self.valid = False
+            # Corner heuristic: grow from the endpoint with fewer exits
+            flipped = self.neighbor_masks[end].bit_count() < self.neighbor_masks[start].bit_count()
+            if flipped:
+                start, end = end, start
+            self.heads.append(start)
+            self.targets.append(end)
+            self.paths.append([start])
+            self.path_masks.append(1 << start)
+            self.flipped.append(flipped)
+            self.occupied |= (1 << start) | (1 << end)
+
+        self.open = set(range(len(pairs)))
+
+        if self.valid and self._border_pairs_cross():
+            self.valid = False
+
+    def _border_pairs_cross(self):
+        """
+        Two pairs with all four endpoints on the outer edge can't both be
+        connected if their endpoints alternate around the edge.
+        """
+        last = self.grid_size - 1
+        edge = ([(x, 0) for x in range(last)] + [(last, y) for y in range(last)] +
+                [(x, last) for x in range(last, 0, -1)] + [(0, y) for y in range(last, 0, -1)])
+        edge_order = {y * self.grid_size + x: i for i, (x, y) in enumerate(edge)}
+
+        spans = []
+        for head, target in zip(self.heads, self.targets):
+            if head in edge_order and target in edge_order:
+                spans.append(sorted((edge_order[head], edge_order[target])))
+
+        for i, (a1, b1) in enumerate(spans):
+            for a2, b2 in spans[i + 1:]:
+                if (a1 < a2 < b1) != (a1 < b2 < b1):
+                    return True
+        return False
+
+    def propagate(self):
+        """
+        Apply the forced moves of the initial position.
+
+        Returns:
+            (index, cells) for every pair these moves complete; [] if the
+            position is invalid or runs into a dead end
+        """
+        if not self.valid:
+            return []
+        while self.open:
+            forced = None
+            for p in sorted(self.open):
+                moves = self._moves(p)
+                if not moves:
+                    # run() finds the dead end again and reports no solution
+                    return []
+                if len(moves) == 1:
+                    forced = (p, moves[0])
+                    break
+            if forced is None:
+                break
+            self._apply(*forced)
+        return [(p, self._cells(p)) for p in range(len(self.paths)) if p not in self.open]
+
+    def run(self):
+        """Run the search and return one list of (x, y) cells per pair, or None."""
+        if not self.valid or not self._search():
+            return None
+        return [self._cells(p) for p in range(len(self.paths))]
+
+    def _cells(self, p):
+        """Path of pair p as (x, y) cells from its first to its second endpoint."""
+        grid_size = self.grid_size
+        cells = [(c % grid_size, c // grid_size) for c in self.paths[p]]
+        if self.flipped[p]:
+            cells.reverse()
+        return cells
+
+    def _moves(self, p):
+        """Legal next cells for the head of pair p."""
+        head = self.heads[p]
+        target = self.targets[p]
+        neighbor_masks = self.neighbor_masks
+
+        # Next to the target the path has to finish, or the target would
+        # end up with two same-colored neighbors
+        if (neighbor_masks[head] >> target) & 1:
+            return [target]
+
+        body = self.path_masks[p] & ~(1 << head)
+        occupied = self.occupied
+        return [c for c in self.neighbors[head]
+                if not (occupied >> c) & 1 and not neighbor_masks[c] & body]
+
+    def _apply(self, p, cell):
+        self.paths[p].append(cell)
+        self.path_masks[p] |= 1 << cell
+        self.occupied |= 1 << cell
+        self.heads[p] = cell
+        if cell == self.targets[p]:
+            self.open.discard(p)
+
+    def _undo(self, p):
+        cell = self.paths[p].pop()
+        self.path_masks[p] &= ~(1 << cell)
+        if cell == self.targets[p]:
+            self.open.add(p)
+        else:
+            self.occupied &= ~(1 << cell)
+        self.heads[p] = self.paths[p][-1]
+
+    def _unwind(self, trail):
+        for p in reversed(trail):
+            self._undo(p)
+
+    def _flood(self, region, allowed):
+        """Grow region through 4-connected cells of allowed."""
+        grid_size = self.grid_size
+        not_first_col = self.not_first_col
+        not_last_col = self.not_last_col
+        while True:
+            grown = (region | ((region << 1) & not_first_col) | ((region >> 1) & not_last_col) |
+                     (region << grid_size) | (region >> grid_size)) & allowed
+            if grown == region:
+                return region
+            region = grown
+
+    def _viable(self):
+        """Prune states where an open pair is cut off or (in fill mode) cells are stranded."""
+        neighbor_masks = self.neighbor_masks
+        free = self.full & ~self.occupied
+
+        regions = []
+        rest = free
+        while rest:
+            region = self._flood(rest & -rest, free)
+            regions.append(region)
+            rest &= ~region
+
+        # Each open pair needs a free region touching both its head and target
+        claimed = 0
+        for p in self.open:
+            head_mask = neighbor_masks[self.heads[p]]
+            target = self.targets[p]
+            if (head_mask >> target) & 1:
+                continue
+            target_mask = neighbor_masks[target]
+            connected = False
+            for i, region in enumerate(regions):
+                if region & head_mask and region & target_mask:
+                    claimed |= 1 << i
+                    connected = True
+            if not connected:
+                return False
+
+        if not self.fill:
+            return True
+
+        # Stranded regions: no open pair can ever pass through them
+        if claimed != (1 << len(regions)) - 1:
+            return False
+
+        # Dead cells: a free cell needs two ways in and out
+        live = free
+        for p in self.open:
+            live |= (1 << self.heads[p]) | (1 << self.targets[p])
+        rest = free
+        while rest:
+            bit = rest & -rest
+            if (neighbor_masks[bit.bit_length() - 1] & live).bit_count() < 2:
+                return False
+            rest ^= bit
+        return True
+
+    def _order_moves(self, p, moves):
+        """Try moves towards the target first, hugging walls and wires on ties."""
+        grid_size = self.grid_size
+        target = self.targets[p]
+        tx, ty = target % grid_size, target // grid_size
+        free = self.full & ~self.occupied
+        neighbor_masks = self.neighbor_masks
+
+        def score(c):
+            distance = abs(c % grid_size - tx) + abs(c // grid_size - ty)
+            exits = (neighbor_masks[c] & free).bit_count()
+            return (exits, distance) if self.fill else (distance, exits)
+
+        return sorted(moves, key=score)
+
+    def _search(self):
+        # Forced-move propagation: apply every single-option move first
+        trail = []
+        while True:
+            if not self.open:
+                if self.fill and self.full & ~self.occupied:
+                    self._unwind(trail)
+                    return False
+                return True
+
+            # Most constrained pair first; on ties keep extending the
+            # pair that has been drawn furthest
+            best = None
+            best_rank = None
+            forced = None
+            for p in sorted(self.open):
+                moves = self._moves(p)
+                if not moves:
+                    self._unwind(trail)
+                    return False
+                if len(moves) == 1:
+                    forced = (p, moves[0])
+                    break
+                rank = (len(moves), -len(self.paths[p]))
+                if best is None or rank < best_rank:
+                    best = (p, moves)
+                    best_rank = rank
+
+            if forced is None:
+                break
+            self._apply(*forced)
+            trail.append(forced[0])
+
+        key = (tuple(self.path_masks), tuple(self.heads))
+        if key in self.failed or not self._viable():
+            self._unwind(trail)
+            return False
+
+        p, moves = best
+        for cell in self._order_moves(p, moves):
+            self._apply(p, cell)
+            if self._search():
+                return True
+            self._undo(p)
+
+        self.failed.add(key)
+        self._unwind(trail)
+        return False
 
 def simplify_path(path):
     """
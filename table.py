@@ -0,0 +1,268 @@
+"""
+Precomputed solution table.
+
+`python table.py build` harvests puzzle layouts from the simulator's
+generator, solves them across a process pool and writes a compact binary
+index:
+
+    header   b"FGT1", entry count (uint32), grid size (uint8), fill (uint8)
+    keys     sorted uint64 puzzle keys
+    offsets  uint32 start of each entry in the data section, plus the end
+    data     per pair in canonical order: start cell, move count, 2-bit moves
+
+SolutionTable memory-maps the file and binary-searches the keys, so a
+lookup is one hash and a couple of dozen comparisons.
+"""
+
+import argparse
+import bisect
+import hashlib
+import mmap
+import multiprocessing
+import os
+import random
+import struct
+import time
+
+import cache
+import simulator
+import solver
+
+MAGIC = b"FGT1"
+HEADER = struct.Struct("<4sIBB6x")
+DEFAULT_PATH = "solutions.bin"
+
+# Move codes: up, right, down, left
+_MOVES = [(0, -1), (1, 0), (0, 1), (-1, 0)]
+
+def puzzle_key(signature):
+    """64-bit table key for a cache.canonical_form() signature."""
+    return int.from_bytes(hashlib.blake2b(signature.encode(), digest_size=8).digest(), "little")
+
+def _expand(path):
+    """Expand a turning-point path into every cell it passes through."""
+    cells = [tuple(path[0])]
+    for (x1, y1), (x2, y2) in zip(path, path[1:]):
+        dx = (x2 > x1) - (x2 < x1)
+        dy = (y2 > y1) - (y2 < y1)
+        x, y = x1, y1
+        while (x, y) != (x2, y2):
+            x, y = x + dx, y + dy
+            cells.append((x, y))
+    return cells
+
+def encode_paths(paths, grid_size):
+    """Pack cell paths as start cell, move count and 2-bit move codes."""
+    data = bytearray()
+    for path in paths:
+        x, y = path[0]
+        moves = [_MOVES.index((x2 - x1, y2 - y1)) for (x1, y1), (x2, y2) in zip(path, path[1:])]
+        data.append(y * grid_size + x)
+        data.append(len(moves))
+        for i in range(0, len(moves), 4):
+            packed = 0
+            for j, move in enumerate(moves[i:i + 4]):
+                packed |= move << (2 * j)
+            data.append(packed)
+    return bytes(data)
+
+def decode_paths(data, count, grid_size):
+    """Inverse of encode_paths() for count paths."""
+    paths = []
+    pos = 0
+    for _ in range(count):
+        start, length = data[pos], data[pos + 1]
+        pos += 2
+        x, y = start % grid_size, start // grid_size
+        path = [(x, y)]
+        for i in range(length):
+            dx, dy = _MOVES[(data[pos + i // 4] >> (2 * (i % 4))) & 3]
+            x, y = x + dx, y + dy
+            path.append((x, y))
+        pos += (length + 3) // 4
+        paths.append(path)
+    return paths
+
+class SolutionTable:
+    """
+    Read-only, memory-mapped view of a table built by build_table().
+
+    Args:
+        path: Table file (default solutions.bin)
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, self.grid_size, fill = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a solution table")
+        self.fill = bool(fill)
+
+        keys_start = HEADER.size
+        offsets_start = keys_start + 8 * count
+        data_start = offsets_start + 4 * (count + 1)
+        self._view = memoryview(self._map)
+        self._keys = self._view[keys_start:offsets_start].cast("Q")
+        self._offsets = self._view[offsets_start:data_start].cast("I")
+        self._data = self._view[data_start:]
+
+    def __len__(self):
+        return len(self._keys)
+
+    def get(self, pairs, grid_size=6, fill=False):
+        """
+        Look up a solution for pairs.
+
+        Returns:
+            List of paths in the same format as solver.solve(), or None
+        """
+        if grid_size != self.grid_size or bool(fill) != self.fill:
+            return None
+
+        signature, transform, canonical = cache.canonical_form(pairs, grid_size, fill)
+        key = puzzle_key(signature)
+        i = bisect.bisect_left(self._keys, key)
+        if i == len(self._keys) or self._keys[i] != key:
+            self.misses += 1
+            return None
+
+        stored = decode_paths(self._data[self._offsets[i]:self._offsets[i + 1]], len(canonical), grid_size)
+
+        # Guard against 64-bit key collisions
+        for path, (a, b) in zip(stored, canonical):
+            if {path[0], path[-1]} != {a, b}:
+                self.misses += 1
+                return None
+
+        self.hits += 1
+        paths = cache.from_canonical(pairs, stored, transform, canonical, grid_size)
+        return [solver.simplify_path(path) for path in paths]
+
+    def close(self):
+        if hasattr(self, "_view"):
+            self._keys.release()
+            self._offsets.release()
+            self._data.release()
+            self._view.release()
+        self._map.close()
+        self._file.close()
+
+def _solve_layout(job):
+    pairs, grid_size, fill = job
+    paths = solver.solve(pairs, grid_size, engine="bitboard", fill=fill)
+    return pairs, paths
+
+def build_table(path=DEFAULT_PATH, count=10000, workers=None, grid_size=6, fill=False, seed=None):
+    """
+    Harvest, solve and write a solution table.
+
+    Args:
+        path: Output file (default solutions.bin)
+        count: Number of distinct layouts to harvest
+        workers: Process pool size (default: one per CPU)
+        grid_size: Size of the square grid (default 6 for 6x6)
+        fill: Solve with every cell covered
+        seed: Random seed for the harvested layouts
+
+    Returns:
+        Number of entries written
+    """
+    rng = random.Random(seed)
+
+    print(f"🎲 Harvesting {count} layouts from the generator...")
+    layouts = {}
+    attempts = 0
+    while len(layouts) < count and attempts < count * 20:
+        attempts += 1
+        pairs = simulator.random_pairs(grid_size, rng)
+        if pairs is not None:
+            signature = cache.canonical_form(pairs, grid_size, fill)[0]
+            layouts.setdefault(signature, pairs)
+
+    print(f"🔧 Solving {len(layouts)} layouts on {workers or os.cpu_count()} workers...")
+    start = time.perf_counter()
+    entries = {}
+    jobs = [(pairs, grid_size, fill) for pairs in layouts.values()]
+    with multiprocessing.Pool(workers) as pool:
+        for pairs, paths in pool.imap_unordered(_solve_layout, jobs, chunksize=64):
+            # The generator only keeps solvable layouts
+            if not all(paths):
+                continue
+            signature, transform, canonical = cache.canonical_form(pairs, grid_size, fill)
+            stored = cache.to_canonical([_expand(p) for p in paths], transform, canonical)
+            entries[puzzle_key(signature)] = encode_paths(stored, grid_size)
+    elapsed = time.perf_counter() - start
+
+    keys = sorted(entries)
+    offsets = [0]
+    for key in keys:
+        offsets.append(offsets[-1] + len(entries[key]))
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(keys), grid_size, int(fill)))
+        f.write(struct.pack(f"<{len(keys)}Q", *keys))
+        f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        for key in keys:
+            f.write(entries[key])
+
+    size = os.path.getsize(path)
+    print(f"✅ Wrote {len(keys)} solvable layouts to {path}")
+    print(f"   Build throughput: {len(jobs) / elapsed:.0f} layouts/s ({elapsed:.1f}s)")
+    print(f"   Table size: {size / 1024:.1f} KiB ({size / max(len(keys), 1):.1f} bytes/entry)")
+    return len(keys)
+
+def table_info(path=DEFAULT_PATH, lookups=10000, seed=None):
+    """Print the table size and the average lookup latency for random layouts."""
+    table = SolutionTable(path)
+    rng = random.Random(seed)
+    queries = [pairs for pairs in (simulator.random_pairs(table.grid_size, rng) for _ in range(lookups))
+               if pairs is not None]
+
+    start = time.perf_counter()
+    for pairs in queries:
+        table.get(pairs, table.grid_size, table.fill)
+    elapsed = time.perf_counter() - start
+
+    print(f"📋 {path}: {len(table)} entries, {os.path.getsize(path) / 1024:.1f} KiB, "
+          f"{table.grid_size}x{table.grid_size}{' fill' if table.fill else ''}")
+    print(f"   Lookup: {elapsed / len(queries) * 1e6:.1f} µs average over {len(queries)} layouts "
+          f"({table.hits} hits)")
+    table.close()
+
+def main():
+    """Main function for command line usage."""
+    parser = argparse.ArgumentParser(description='Build or inspect a precomputed solution table')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help='Harvest and solve layouts into a table')
+    build.add_argument('-o', '--output', default=DEFAULT_PATH,
+                       help=f'Output file (default: {DEFAULT_PATH})')
+    build.add_argument('-n', '--count', type=int, default=10000,
+                       help='Number of distinct layouts to harvest (default: 10000)')
+    build.add_argument('-j', '--workers', type=int, default=None,
+                       help='Worker processes (default: one per CPU)')
+    build.add_argument('-s', '--size', type=int, default=6,
+                       help='Size of the puzzle grid (default: 6 for 6x6)')
+    build.add_argument('--fill', action='store_true',
+                       help='Require the wires to cover every cell of the grid')
+    build.add_argument('--seed', type=int, default=None,
+                       help='Random seed for the harvested layouts')
+
+    info = subparsers.add_parser('info', help='Show table size and lookup latency')
+    info.add_argument('table', nargs='?', default=DEFAULT_PATH,
+                      help=f'Table file (default: {DEFAULT_PATH})')
+
+    args = parser.parse_args()
+    if args.command == 'build':
+        build_table(args.output, args.count, args.workers, args.size, args.fill, args.seed)
+    else:
+        table_info(args.table)
+
+if __name__ == "__main__":
+    main()
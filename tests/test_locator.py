@@ -0,0 +1,38 @@
+import random
+
+import numpy as np
+import pytest
+
+import benchmark
+import locator
+
+def _noise(seed=0):
+    return np.random.default_rng(seed).integers(0, 80, (1000, 1600, 3), dtype=np.uint8)
+
+def _screen(board, x, y):
+    screen = _noise()
+    size = len(board)
+    screen[y:y + size, x:x + size] = board
+    return screen
+
+@pytest.mark.parametrize("size, x, y", [(360, 40, 500), (600, 700, 90), (900, 300, 60)])
+def test_locate_finds_a_rendered_board(size, x, y):
+    rng = random.Random(size)
+    pairs = None
+    while pairs is None:
+        pairs = benchmark.random_board(8, 6, rng)
+
+    found = locator.locate(_screen(benchmark.render_board(pairs, 6, size), x, y), grid_size=6)
+
+    assert found is not None
+    assert abs(found[0] - x) <= 4 and abs(found[1] - y) <= 4 and abs(found[2] - size) <= 8
+
+@pytest.mark.parametrize("grid_size", [7, 8, 9])
+def test_locate_rejects_a_bigger_grid_with_the_same_pitch(grid_size):
+    # Any 6 x 6 block of its cells lines up, but there are more lines
+    # one pitch outside it
+    board = benchmark.render_board([], grid_size, 100 * grid_size)
+    assert locator.locate(_screen(board, 200, 50), grid_size=6) is None
+
+def test_locate_finds_nothing_without_a_grid():
+    assert locator.locate(_noise(), grid_size=6) is None
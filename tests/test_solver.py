@@ -0,0 +1,22 @@
+import pytest
+
+import solver
+
+# The (0, 1)-(1, 1) pair is forced before the search branches, but the
+# other two can't both be routed around it
+UNSOLVABLE = [[(3, 3), (2, 0)], [(0, 1), (1, 1)], [(1, 2), (3, 0)]]
+
+@pytest.mark.parametrize("engine", ["bitboard", "z3"])
+def test_iter_solve_yields_nothing_but_empty_paths_when_unsolvable(engine):
+    results = list(solver.iter_solve(UNSOLVABLE, grid_size=4, engine=engine))
+
+    assert sorted(i for i, _ in results) == [0, 1, 2]
+    assert all(path == [] for _, path in results)
+
+def test_iter_solve_streams_every_path_of_a_solvable_board():
+    pairs = [[(0, 0), (3, 0)], [(0, 1), (3, 3)]]
+
+    results = dict(solver.iter_solve(pairs, grid_size=4, engine="bitboard"))
+
+    assert sorted(results) == [0, 1]
+    assert results == dict(enumerate(solver.solve(pairs, grid_size=4, engine="bitboard")))
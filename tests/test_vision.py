@@ -0,0 +1,62 @@
+import random
+import time
+
+import numpy as np
+import pytest
+
+import benchmark
+import vision
+
+def _boards(count, grid_size, size, seed=0):
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        pairs = benchmark.random_board(rng.randint(4, 13), grid_size, rng)
+        if pairs is not None:
+            boards.append(benchmark.render_board(pairs, grid_size, size))
+    return boards
+
+@pytest.mark.parametrize("size", [300, 600, 901, 1440])
+def test_probe_sampler_matches_to_grid_on_rendered_boards(size):
+    sampler = vision.ProbeSampler(size)
+    for image in _boards(10, 6, size):
+        assert np.array_equal(sampler.sample(image), vision.to_grid(image))
+
+def test_probe_sampler_falls_back_where_probes_disagree():
+    image = _boards(1, 6, 600)[0]
+    noisy = image.copy()
+    noisy[::7, ::5] = (255, 255, 255)
+    sampler = vision.ProbeSampler(600)
+    assert np.array_equal(sampler.sample(noisy), vision.to_grid(noisy))
+    assert sampler.fallbacks > 0
+
+def test_probe_sampler_keeps_a_color_every_probe_agrees_on():
+    # A dot under all 9 probes but on a minority of the center area: the
+    # approximation to_grid()'s full count would not make
+    image = np.full((600, 600, 3), 18, dtype=np.uint8)
+    sampler = vision.ProbeSampler(600)
+    rows = np.unique(sampler.flat[0] // 600)
+    cols = np.unique(sampler.flat[0] % 600)
+    for y in rows:
+        for x in cols:
+            image[y - 1:y + 2, x - 1:x + 2] = (230, 40, 40)
+
+    assert tuple(sampler.sample(image)[0, 0]) == (230, 40, 40)
+    assert tuple(vision.to_grid(image)[0, 0]) == (18, 18, 18)
+
+def test_classify_is_bounded_on_many_similar_colors():
+    # A half-drawn board: 30 colored cells, all a few shades off one color
+    # (the exact search took 3.5 s on this one)
+    rng = np.random.default_rng(2)
+    grid = np.zeros((6, 6, 3), dtype=np.uint8)
+    cells = rng.choice(36, 30, replace=False)
+    grid.reshape(-1, 3)[cells] = np.array([230, 40, 40]) + rng.integers(-12, 13, (30, 3))
+
+    start = time.perf_counter()
+    labels, _, pairs, _ = vision.classify(grid)
+    runner_up = vision.classify(grid, rank=1)
+    assert time.perf_counter() - start < 1.0
+
+    assert len(pairs) == 15
+    assert sorted(np.flatnonzero(labels.ravel() >= 0)) == sorted(cells)
+    assert runner_up is not None
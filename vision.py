@@ -1,7 +1,11 @@
+import logging
+
 from PIL import Image, ImageDraw
 import mss
 import numpy as np
 
+log = logging.getLogger(__name__)
+
 def capture_screen(config):
     region_x, region_y, region_height = config[0], config[1], config[2]
     region_width = region_height  # Square region
@@ -10,79 +14,216 @@ def capture_screen(config):
         img = Image.frombytes('RGB', (screenshot.width, screenshot.height), screenshot.rgb)
         return img
 
+def bgra_to_rgb(buffer, width, height):
+    """View a raw BGRA buffer as an HxWx3 RGB array without copying."""
+    bgra = np.frombuffer(buffer, dtype=np.uint8).reshape(height, width, 4)
+    return bgra[:, :, 2::-1]
+
+def to_image(image):
+    """Return image as a PIL RGB image (arrays are converted)."""
+    if isinstance(image, Image.Image):
+        return image
+    return Image.fromarray(np.ascontiguousarray(image[:, :, :3]))
+
+def pixel_color(image, x, y):
+    """(r, g, b) of pixel (x, y) in a PIL image or HxWx3 array."""
+    if isinstance(image, Image.Image):
+        return image.getpixel((x, y))
+    return tuple(int(c) for c in image[y, x, :3])
+
+def _pixel_list(image):
+    """All pixels in row-major order as (r, g, b) tuples."""
+    if isinstance(image, Image.Image):
+        return list(image.getdata())
+    return [tuple(p) for p in np.asarray(image)[:, :, :3].reshape(-1, 3).tolist()]
+
 def to_grid(image, grid_size=6, border_percent=0.26, debug=False):
     """
     Convert square input image to NxN grid by sampling center areas of each cell.
 
+    The capture is viewed as a (grid, grid, cell, cell, 3) array with the
+    border fraction sliced off, and the dominant color of every cell is
+    found in one np.unique pass over packed RGB values.
+
     Args:
-        image: Square PIL image (e.g., 60x60, 120x120, etc.)
+        image: Square PIL image or HxWx3 uint8 array (e.g., 60x60, 120x120, etc.)
         grid_size: Size of the grid (default 6 for 6x6)
         border_percent: Percentage of border to remove from each cell (default 0.26 = 26%)
         debug: If True, saves combined center crop areas to grid.png (default False)
 
     Returns:
-        NxN PIL image with averaged colors from center areas
+        NxN PIL image with the dominant colors from center areas, or an
+        NxNx3 array when given an array
     """
+    as_array = not isinstance(image, Image.Image)
+    if not as_array:
+        image = np.asarray(image.convert("RGB"))
+
     # Ensure square image
-    width, height = image.size
+    height, width = image.shape[:2]
     if width != height:
         # Crop to square if not already
         size = min(width, height)
         left = (width - size) // 2
         top = (height - size) // 2
-        image = image.crop((left, top, left + size, top + size))
+        image = image[top:top + size, left:left + size]
         width = height = size
 
-    image = image.convert("RGB")
-    cell_size = width / grid_size  # Size of each cell in the input image
-    border_pixels = int(cell_size * border_percent)  # Pixels to remove from each side
-
-    # Create output NxN image
-    output_image = Image.new("RGB", (grid_size, grid_size))
-    pixels = []
-
-    # For debug mode, collect all center crops
-    if debug:
-        center_crops = []
-
-    for row in range(grid_size):
-        for col in range(grid_size):
-            # Calculate cell boundaries in input image
-            left = int(col * cell_size)
-            top = int(row * cell_size)
-            right = int((col + 1) * cell_size)
-            bottom = int((row + 1) * cell_size)
-
-            # Apply border reduction to sample from center area
-            sample_left = left + border_pixels
-            sample_top = top + border_pixels
-            sample_right = right - border_pixels
-            sample_bottom = bottom - border_pixels
-
-            # Ensure we have at least 1x1 area to sample
-            if sample_right <= sample_left:
-                sample_right = sample_left + 1
-            if sample_bottom <= sample_top:
-                sample_bottom = sample_top + 1
-
-            # Crop the center area of this cell
-            cell_crop = image.crop((sample_left, sample_top, sample_right, sample_bottom))
-
-            # Store for debug visualization
-            if debug:
-                center_crops.append((row, col, cell_crop))
-
-            # Get average color of this center area
-            avg_color = get_average_color(cell_crop)
-            pixels.append(avg_color)
+    cells = _cell_centers(image[:, :, :3], grid_size, border_percent)
 
     # Save debug visualization if requested
     if debug:
+        center_crops = [(row, col, Image.fromarray(np.ascontiguousarray(cells[row][col])))
+                        for row in range(grid_size) for col in range(grid_size)]
         save_debug_grid(center_crops, grid_size)
 
-    # Set all pixels in the NxN output
-    output_image.putdata(pixels)
-    return output_image
+    grid = _dominant_colors(cells, grid_size)
+    return grid if as_array else Image.fromarray(grid)
+
+def cell_bounds(size, grid_size=6, border_percent=0.26):
+    """
+    (start, stop) pixel range of every cell's center sample area along one
+    axis of a size x size capture, with the border fraction cut off.
+    """
+    cell_size = size / grid_size  # Size of each cell in the input image
+    border_pixels = int(cell_size * border_percent)  # Pixels to remove from each side
+    bounds = []
+    for i in range(grid_size):
+        # Calculate cell boundaries in input image, then apply border reduction
+        start = int(i * cell_size) + border_pixels
+        stop = int((i + 1) * cell_size) - border_pixels
+        # Ensure we have at least 1x1 area to sample
+        bounds.append((start, max(stop, start + 1)))
+    return bounds
+
+def _cell_centers(image, grid_size, border_percent):
+    """
+    Center sample area of every cell, indexable as cells[row][col].
+
+    Returns a (grid, grid, h, w, 3) view when the image divides evenly into
+    cells, otherwise nested lists of per-cell views.
+    """
+    width = image.shape[1]
+    if width % grid_size == 0:
+        cell = width // grid_size
+        border_pixels = int(cell * border_percent)
+        stop = max(cell - border_pixels, border_pixels + 1)
+        cells = image.reshape(grid_size, cell, grid_size, cell, 3).swapaxes(1, 2)
+        return cells[:, :, border_pixels:stop, border_pixels:stop]
+
+    bounds = cell_bounds(width, grid_size, border_percent)
+    return [[image[top:bottom, left:right] for left, right in bounds] for top, bottom in bounds]
+
+def _dominant_colors(cells, grid_size):
+    """Most common color of every cell, as a (grid, grid, 3) uint8 array."""
+    count = grid_size * grid_size
+    if isinstance(cells, np.ndarray):
+        pixels = cells.reshape(count, -1, 3)
+        cell_ids = np.repeat(np.arange(count, dtype=np.int64), pixels.shape[1])
+        pixels = pixels.reshape(-1, 3)
+    else:
+        flat = [cell.reshape(-1, 3) for row in cells for cell in row]
+        cell_ids = np.repeat(np.arange(count, dtype=np.int64), [len(f) for f in flat])
+        pixels = np.concatenate(flat)
+
+    # Pack each pixel as cell << 24 | RGB so one unique() counts every cell
+    pixels = pixels.astype(np.int64)
+    packed = (cell_ids << 24) | (pixels[:, 0] << 16) | (pixels[:, 1] << 8) | pixels[:, 2]
+    values, counts = np.unique(packed, return_counts=True)
+
+    # Highest count per cell; ties go to the lowest packed color
+    cell_of = values >> 24
+    order = np.lexsort((-counts, cell_of))
+    first = order[np.r_[True, cell_of[order][1:] != cell_of[order][:-1]]]
+    colors = values[first] & 0xFFFFFF
+
+    rgb = np.stack([(colors >> 16) & 0xFF, (colors >> 8) & 0xFF, colors & 0xFF], axis=1)
+    return rgb.astype(np.uint8).reshape(grid_size, grid_size, 3)
+
+class ProbeSampler:
+    """
+    Sparse alternative to to_grid() for a fixed capture size.
+
+    A probes x probes lattice of points inside each cell's center area (the
+    same area to_grid() samples) is turned into one flat pixel index array
+    up front. Sampling a frame is then a single gather of grid * grid *
+    probes * probes pixels, whatever the capture resolution.
+
+    This approximates to_grid(): only cells whose probes disagree fall back
+    to its full count. A cell whose probes all land on one color gets that
+    color even if it isn't the most common one in the cell (e.g. a small
+    dot covering every probe but less than half the center area).
+
+    Args:
+        size: Width and height of the captured region in pixels
+        grid_size: Size of the grid (default 6 for 6x6)
+        border_percent: As for to_grid() (default 0.26)
+        probes: Probe points per cell side (default 3)
+        strips: Frames hold only the center band of each cell row, stacked
+            top to bottom, as grabbed by capture.RegionCapture(grid_size=...)
+    """
+
+    def __init__(self, size, grid_size=6, border_percent=0.26, probes=3, strips=False):
+        self.size = size
+        self.grid_size = grid_size
+        self.border_percent = border_percent
+        self.strips = strips
+        self.fallbacks = 0
+
+        # Sample areas in frame coordinates: columns are always the cell
+        # centers, rows are shifted when only the bands were captured
+        self._cols = cell_bounds(size, grid_size, border_percent)
+        if strips:
+            self._rows = []
+            height = 0
+            for start, stop in self._cols:
+                self._rows.append((height, height + stop - start))
+                height += stop - start
+        else:
+            self._rows = self._cols
+            height = size
+        self.shape = (height, size)
+
+        def lattice(bounds):
+            return np.array([[start + int((k + 0.5) * (stop - start) / probes) for k in range(probes)]
+                             for start, stop in bounds])
+
+        # flat[cell, probe] = y * size + x, cells in row-major order
+        rows = lattice(self._rows)[:, None, :, None]
+        cols = lattice(self._cols)[None, :, None, :]
+        flat = rows * size + cols
+        self.flat = flat.reshape(grid_size * grid_size, probes * probes)
+
+    def sample(self, image):
+        """
+        Dominant color of every cell of a capture.
+
+        Args:
+            image: PIL image or HxWx3 uint8 array, of the region (or of its
+                bands when strips is set)
+
+        Returns:
+            NxNx3 uint8 array; to_grid()'s result for every cell whose
+            probes disagree, the probed color for the others
+        """
+        as_array = not isinstance(image, Image.Image)
+        pixels = np.asarray(image if as_array else image.convert("RGB"))[:, :, :3]
+        if pixels.shape[:2] != self.shape:
+            if self.strips:
+                raise ValueError(f"Expected a {self.shape} strip frame, got {pixels.shape[:2]}")
+            return to_grid(pixels, self.grid_size, self.border_percent)
+
+        # reshape() keeps the BGRA -> RGB strided view a view, no copy
+        probed = pixels.reshape(-1, 3)[self.flat]
+        grid = probed[:, 0].copy()
+        disagree = np.flatnonzero((probed != probed[:, :1]).any(axis=(1, 2)))
+
+        self.fallbacks += len(disagree)
+        for cell in disagree.tolist():
+            row, col = divmod(cell, self.grid_size)
+            (top, bottom), (left, right) = self._rows[row], self._cols[col]
+            grid[cell] = _dominant_colors([[pixels[top:bottom, left:right]]], 1)[0, 0]
+        return grid.reshape(self.grid_size, self.grid_size, 3)
 
 def save_debug_grid(center_crops, grid_size):
     """
@@ -113,54 +254,39 @@ def save_debug_grid(center_crops, grid_size):
 
     # Save the combined image
     combined_image.save('grid.png')
-    print(f"Debug: Saved center crops grid to grid.png ({total_width}x{total_height})")
-
-def get_average_color(image):
-    """Calculate the average color of an image."""
-
-    data = list(image.getdata())
-
-    data_set = set(data)
-    counts={}
-    for color in data_set:
-        counts[color]=data.count(color)
-
-    dominant_color = max(counts, key=counts.get)
-    return dominant_color
+    log.debug("Debug: Saved center crops grid to grid.png (%dx%d)", total_width, total_height)
 
-    # Convert to numpy array for easy averaging
-    # img_array = np.array(image)
-
-    # # Calculate mean for each color channel
-    # if len(img_array.shape) == 3:  # RGB image
-    #     avg_color = np.mean(img_array, axis=(0, 1))
-    #     return tuple(int(c) for c in avg_color)
-    # else:  # Grayscale or other format
-    #     avg_color = np.mean(img_array)
-    #     return (int(avg_color), int(avg_color), int(avg_color))
+def _near_black(pixels, allowance=10):
+    """Boolean mask of the near-black entries of an (..., 3) RGB array."""
+    black = 10
+    return (np.abs(pixels.astype(np.int16) - black) <= allowance).all(axis=-1)
 
+def clean_black(image, allowance=10):
+    """Set near-black pixels to (0, 0, 0). Returns the same type it was given."""
+    pixels = np.asarray(image)[:, :, :3]
+    near_black = _near_black(pixels, allowance)
+    output = np.where(near_black[:, :, None], 0, pixels).astype(np.uint8)
+    if isinstance(image, Image.Image):
+        return Image.fromarray(output)
+    return output
+
+def nearest_color_labels(processed, colors):
+    """
+    Label every cell of a processed grid with its nearest reference color.
 
+    Args:
+        processed: Processed NxN PIL image or NxNx3 array (after clean_black)
+        colors: List of (r, g, b) reference colors
 
-def clean_black(image, allowance=10):
-    pixels = list(image.getdata())
-    output_pixels = []
-    black = 10
-    for r, g, b in pixels:
-        if abs(r - black) <= allowance and abs(g - black) <= allowance and abs(b - black) <= allowance:
-            output_pixels.append((0, 0, 0))
-        else:
-            output_pixels.append((r, g, b))
-    output_image = Image.new("RGB", image.size)
-    output_image.putdata(output_pixels)
-    return output_image
-
-def closest(colors,color):
-    colors = np.array(colors)
-    color = np.array(color)
-    distances = np.sqrt(np.sum((colors-color)**2,axis=1))
-    index_of_smallest = np.where(distances==np.amin(distances))[0][0]
-    smallest_distance = colors[index_of_smallest]
-    return tuple(smallest_distance)
+    Returns:
+        NxN int array of indices into colors, -1 for black cells
+    """
+    cells = np.asarray(processed)[:, :, :3].astype(np.int32)
+    reference = np.asarray(colors, dtype=np.int32).reshape(-1, 3)
+    distances = ((cells[:, :, None, :] - reference[None, None, :, :]) ** 2).sum(axis=-1)
+    labels = distances.argmin(axis=-1)
+    labels[~cells.any(axis=-1)] = -1
+    return labels
 
 def image_index_to_pos(image_index, grid_size=6):
     """Convert linear image index to (x, y) coordinates."""
@@ -169,9 +295,45 @@ def image_index_to_pos(image_index, grid_size=6):
     return (y, x)
 
 def count_non_black_pixels(image):
-    pixels = list(image.getdata())
-    black = (0, 0, 0)
-    return len(pixels) - pixels.count(black)
+    return int(np.asarray(image)[:, :, :3].any(axis=-1).sum())
+
+def frame_signature(frame, step=16):
+    """
+    Cheap fingerprint of a captured frame for change detection.
+
+    Samples every step-th pixel and drops the low 4 bits of each channel,
+    so capture noise doesn't change the signature.
+    """
+    sample = np.asarray(frame)[::step, ::step, :3] >> 4
+    return hash(sample.tobytes())
+
+# Most wire pairs the generator minigame places on a board
+MAX_PAIRS = 13
+
+def colored_cells(grid):
+    """Number of cells of a to_grid() grid that aren't near black: dots and drawn wire cells."""
+    return int((~_near_black(np.asarray(grid)[:, :, :3])).sum())
+
+def is_fresh_puzzle(processed, tolerance=40):
+    """
+    Check whether a processed grid looks like an unsolved puzzle.
+
+    A fresh puzzle has an even number of colored cells, at most two per
+    pair the generator places, some empty cells and no color on more than
+    two cells; drawn wires color the cells they pass through.
+
+    Args:
+        processed: Processed NxN PIL image or NxNx3 array (after clean_black)
+        tolerance: RGB distance under which two cells count as the same color
+    """
+    colors = np.asarray(processed)[:, :, :3].reshape(-1, 3).astype(np.int32)
+    cells = len(colors)
+    colors = colors[colors.any(axis=1)]
+    if len(colors) < 2 or len(colors) % 2 or len(colors) > 2 * MAX_PAIRS or len(colors) == cells:
+        return False
+    distances = np.sqrt(((colors[:, None, :] - colors[None, :, :]) ** 2).sum(axis=2))
+    same_color = (distances <= tolerance).sum(axis=1)
+    return bool((same_color <= 2).all())
 
 def visualize_path(solutions, processed=None, grid_size=6, cell_size=50):
     """
@@ -179,7 +341,7 @@ def visualize_path(solutions, processed=None, grid_size=6, cell_size=50):
 
     Args:
         solutions: List of paths from solver.solve()
-        processed: PIL Image object of the processed NxN image (optional)
+        processed: Processed NxN PIL image or NxNx3 array (optional)
         grid_size: Size of the grid (e.g., 6 for 6x6)
         cell_size: Size of each cell in pixels
 
@@ -205,13 +367,13 @@ def visualize_path(solutions, processed=None, grid_size=6, cell_size=50):
 
     # Function to get color from processed image
     def get_color_from_processed(x, y):
-        if processed and 0 <= x < grid_size and 0 <= y < grid_size:
+        if processed is not None and 0 <= x < grid_size and 0 <= y < grid_size:
             # Get pixel color from processed image
-            pixel_color = processed.getpixel((x, y))
+            color = pixel_color(processed, x, y)
             # If the color is black, use a default color
-            if pixel_color == (0, 0, 0):
+            if color == (0, 0, 0):
                 return 'white'
-            return pixel_color
+            return color
         else:
             # Fallback colors if no processed image
             fallback_colors = [
@@ -281,39 +443,220 @@ def visualize_path(solutions, processed=None, grid_size=6, cell_size=50):
 
     return image
 
-def match(image, grid_size=6):
-    """Matches non-black pixels in pairs of closest colors and returns their positions."""
-    pixels = list(image.getdata())
+# A pair whose ΔE is more than this fraction of the ΔE to the nearest other
+# dot could be mispaired
+AMBIGUITY_THRESHOLD = 0.5
 
-    # Create list of (index, color) for non-black pixels
-    non_black_data = [(i, pixels[i]) for i in range(len(pixels)) if pixels[i] != (0, 0, 0)]
+# Search nodes _best_matchings() may visit before settling for the best
+# pairings found so far; many similar colors (a half-drawn board) make the
+# exact search exponential
+MATCH_BUDGET = 5000
 
-    matched_pairs = []
-    used_indices = set()
+def rgb_to_lab(colors):
+    """
+    Convert sRGB colors to CIE L*a*b* (D65).
 
-    for i, (pixel_index, color) in enumerate(non_black_data):
-        if i in used_indices:
-            continue
+    Args:
+        colors: (..., 3) array-like of 0-255 RGB values
 
-        # Get available colors and their data
-        available_data = [(j, non_black_data[j]) for j in range(len(non_black_data))
-                         if j not in used_indices and j != i]
+    Returns:
+        (..., 3) float array of L*, a*, b*
+    """
+    rgb = np.asarray(colors, dtype=np.float64) / 255.0
+    linear = np.where(rgb > 0.04045, ((rgb + 0.055) / 1.055) ** 2.4, rgb / 12.92)
+    xyz = linear @ np.array([[0.4124, 0.2126, 0.0193],
+                             [0.3576, 0.7152, 0.1192],
+                             [0.1805, 0.0722, 0.9505]])
+    xyz /= np.array([0.95047, 1.0, 1.08883])
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.stack([116 * f[..., 1] - 16,
+                     500 * (f[..., 0] - f[..., 1]),
+                     200 * (f[..., 1] - f[..., 2])], axis=-1)
+
+def _greedy_matching(distances, spare):
+    """
+    Closest remaining pair first until at most spare dots are left.
 
-        if not available_data:
-            continue
+    Returns:
+        (cost, [(i, j), ...]) with i < j, sorted
+    """
+    n = len(distances)
+    edges = sorted((distances[i][j], i, j) for i in range(n) for j in range(i + 1, n))
+    open_dots = set(range(n))
+    cost = 0.0
+    pairs = []
+    for distance, i, j in edges:
+        if len(open_dots) <= spare:
+            break
+        if i in open_dots and j in open_dots:
+            open_dots -= {i, j}
+            cost += distance
+            pairs.append((i, j))
+    return cost, sorted(pairs)
+
+class _BudgetExhausted(Exception):
+    pass
+
+def _best_matchings(distances, count, budget=MATCH_BUDGET):
+    """
+    Branch-and-bound search for the count cheapest perfect matchings.
+
+    With an odd number of dots one of them may stay unmatched for free.
+    The lower bound is half of every open dot's cheapest edge to another
+    open dot. The greedy matching seeds the results, and once budget
+    search nodes are visited the best ones found so far are returned, so
+    the result is exact only for boards the search finishes on.
 
-        available_colors = [data[1][1] for data in available_data]  # Extract colors
-        closest_color = closest(available_colors, color)
-
-        # Find the index in non_black_data that has this closest color
-        for j, (other_pixel_index, other_color) in enumerate(non_black_data):
-            if j not in used_indices and j != i and other_color == closest_color:
-                # Convert indices to positions
-                pos1 = image_index_to_pos(pixel_index, grid_size)
-                pos2 = image_index_to_pos(other_pixel_index, grid_size)
-                matched_pairs.append([pos1, pos2])
-                used_indices.add(i)
-                used_indices.add(j)
+    Returns:
+        List of (cost, [(i, j), ...]) sorted by cost
+    """
+    n = len(distances)
+    # Partners of every dot, cheapest first
+    partners = [sorted((j for j in range(n) if j != i), key=lambda j: distances[i][j]) for i in range(n)]
+    found = [_greedy_matching(distances, n % 2)]
+    nodes = 0
+
+    def bound(open_dots, spare):
+        halves = []
+        rest = open_dots
+        while rest:
+            i = (rest & -rest).bit_length() - 1
+            rest &= rest - 1
+            for j in partners[i]:
+                if (open_dots >> j) & 1:
+                    halves.append(distances[i][j] / 2)
+                    break
+        if spare and halves:
+            # A spare dot can be left out, drop the most expensive one
+            halves.remove(max(halves))
+        return sum(halves)
+
+    def search(open_dots, spare, cost, pairs):
+        nonlocal nodes
+        nodes += 1
+        if nodes > budget:
+            raise _BudgetExhausted()
+        if len(found) == count and cost + bound(open_dots, spare) >= found[-1][0]:
+            return
+        if open_dots.bit_count() <= spare:
+            if any(pairs == entry[1] for entry in found):
+                # The greedy seed
+                return
+            found.append((cost, list(pairs)))
+            found.sort(key=lambda entry: entry[0])
+            del found[count:]
+            return
+
+        i = (open_dots & -open_dots).bit_length() - 1
+        rest = open_dots & ~(1 << i)
+        for j in partners[i]:
+            if len(found) == count and cost + distances[i][j] >= found[-1][0]:
+                # Partners are sorted, every later one costs more
                 break
+            if (rest >> j) & 1:
+                pairs.append((i, j))
+                search(rest & ~(1 << j), spare, cost + distances[i][j], pairs)
+                pairs.pop()
+        if spare:
+            search(rest, spare - 1, cost, pairs)
+
+    try:
+        search((1 << n) - 1, n % 2, 0.0, [])
+    except _BudgetExhausted:
+        log.debug("Pairing search stopped after %d nodes on %d dots", budget, n)
+    return found
+
+def match_candidates(image, grid_size=6, count=2):
+    """
+    Pair the colored dots by color, best pairings first.
 
-    return matched_pairs
+    Every dot's color is converted to L*a*b* and the pairing minimizing the
+    total color difference (ΔE) is found exactly, along with the runners-up.
+
+    Args:
+        image: NxN PIL image or NxNx3 array from to_grid, cleaned or not
+            (near-black cells are never dots)
+        grid_size: Size of the grid
+        count: Number of pairings to return
+
+    Returns:
+        List of up to count (pairs, cost, ambiguity) tuples. pairs is in the
+        format match() returns, cost is the total ΔE and ambiguity has one
+        score per pair: its ΔE divided by the ΔE from either endpoint to
+        the nearest dot outside the pair. Scores above AMBIGUITY_THRESHOLD
+        mark pairs that could be mixed up.
+    """
+    pixels = np.asarray(image)[:, :, :3].reshape(-1, 3)
+    return [([[image_index_to_pos(a, grid_size), image_index_to_pos(b, grid_size)] for a, b in matching],
+             cost, ambiguity)
+            for matching, cost, ambiguity in _pairings(pixels, count)]
+
+def _pairings(pixels, count):
+    """
+    match_candidates() on a flat (N*N, 3) pixel array.
+
+    Returns:
+        List of (matching, cost, ambiguity) with matching as (index, index)
+        pairs of flat cell indices
+    """
+    indices = np.flatnonzero(~_near_black(pixels))
+    if len(indices) < 2:
+        return [([], 0.0, [])]
+
+    lab = rgb_to_lab(pixels[indices])
+    distances = np.sqrt(((lab[:, None, :] - lab[None, :, :]) ** 2).sum(axis=-1))
+    np.fill_diagonal(distances, np.inf)
+
+    candidates = []
+    for cost, matching in _best_matchings(distances.tolist(), count):
+        cells = []
+        ambiguity = []
+        for i, j in sorted(matching):
+            cells.append((int(indices[i]), int(indices[j])))
+            others = np.delete(distances[[i, j]], [i, j], axis=1)
+            nearest = others.min() if others.size else np.inf
+            ambiguity.append(float(distances[i, j] / nearest) if nearest > 0 else np.inf)
+        candidates.append((cells, float(cost), ambiguity))
+    return candidates
+
+def classify(grid, grid_size=6, rank=0):
+    """
+    Label every cell of a sampled grid in one NumPy pass.
+
+    Replaces clean_black() + match() for callers that hold the to_grid()
+    array: near-black cells are empty, the rest are paired by color.
+
+    Args:
+        grid: NxN PIL image or NxNx3 array from to_grid()
+        grid_size: Size of the grid
+        rank: Which pairing to use, 0 for the best, 1 for the runner-up...
+
+    Returns:
+        (labels, palette, pairs, ambiguity), or None if there is no
+        pairing of that rank. labels is an NxN int array, -1 for empty
+        cells (and a dot left without a partner), k for both dots of
+        pair k; palette is a (pairs, 3) uint8 array with the color of each
+        pair's first dot; pairs and ambiguity are as from match_candidates()
+    """
+    pixels = np.asarray(grid)[:, :, :3].reshape(-1, 3)
+    candidates = _pairings(pixels, rank + 1)
+    if rank >= len(candidates):
+        return None
+    matching, _, ambiguity = candidates[rank]
+
+    labels = np.full(grid_size * grid_size, -1, dtype=np.int16)
+    first = np.array([a for a, _ in matching], dtype=np.intp)
+    for k, (a, b) in enumerate(matching):
+        labels[a] = labels[b] = k
+    palette = pixels[first].astype(np.uint8)
+    pairs = [[image_index_to_pos(a, grid_size), image_index_to_pos(b, grid_size)] for a, b in matching]
+    return labels.reshape(grid_size, grid_size), palette, pairs, ambiguity
+
+def paint(labels, grid):
+    """Processed grid for labels: the sampled color on labelled cells, black elsewhere."""
+    cells = np.asarray(grid)[:, :, :3]
+    return np.where(labels[:, :, None] >= 0, cells, 0).astype(np.uint8)
+
+def match(image, grid_size=6):
+    """Matches non-black pixels in pairs of closest colors and returns their positions."""
+    return match_candidates(image, grid_size, count=1)[0][0]